@@ -1,32 +1,88 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Blueprint, Flask, current_app, has_app_context, request, jsonify, render_template, stream_with_context
+from flask_migrate import Migrate, stamp, upgrade
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, func, inspect, literal, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import joinedload
 from flask_cors import CORS
-from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash, check_password_hash
-import uuid
+from werkzeug.middleware.proxy_fix import ProxyFix
+from datetime import date, datetime, timedelta
+import codecs
+import hashlib
+import json
+import os
+import time
+import click
 import jwt
+from collections import namedtuple
 from functools import wraps
+from cache import TTLCache, build_response_cache
+from delivery import build_backends
+from keys import IDConverter, KeyType, configure_keys, key_bytes, new_id, parse_id
+from metrics import RequestMetrics, timed
+from capacity import CapacityIndex, CapacityTimeline, allocate, slot_peaks
+from passwords import HasherBusy, LoginThrottle, PasswordHasher
+from pagination import after_cursor, decode_cursor, decode_offset, encode_cursor, encode_offset, keyset_page, parse_limit
+from serialization import build_json_encoder
+from storage import configure_storage
+import search
+import transfer
+import utilization
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///lab_reservation.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = 'your-secret-key-change-this'
-
-# Configure CORS
-CORS(app, resources={
-    r"/api/*": {
-        "origins": ["http://localhost:3000"],
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
-    }
-})
+# Default settings. create_app() applies these first, then the storage
+# settings from the environment, then any overrides it is given.
+class Config:
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    COMPACT_KEYS = False  # store keys as 16-byte values; read from the environment, see keys.py
+    SECRET_KEY = 'your-secret-key-change-this'
+    PRINCIPAL_CACHE_SIZE = 4096
+    PRINCIPAL_CACHE_TTL = 60  # seconds
+    RESERVATION_BATCH_LIMIT = 500
+    APPROVAL_BATCH_LIMIT = 2000
+    IMPORT_BATCH_SIZE = 1000  # rows per transaction
+    IMPORT_MAX_ERRORS = 100  # row errors reported back
+    EXPORT_BATCH_SIZE = 1000  # rows fetched per round trip
+    NOTIFICATION_MAX_ATTEMPTS = 5
+    NOTIFICATION_RETRY_DELAY = 60  # seconds before a failed delivery is tried again
+    NOTIFICATION_LOG_PATH = None  # e.g. 'notifications.log'
+    NOTIFICATION_SMTP_HOST = None
+    NOTIFICATION_POLL_INTERVAL = 1.0  # seconds between checks while long-polling or streaming
+    NOTIFICATION_LONG_POLL_MAX = 30  # seconds
+    NOTIFICATION_STREAM_TIMEOUT = 300  # seconds before an event stream asks the client to reconnect
+    RESPONSE_CACHE_BACKEND = 'memory'  # or 'directory' to share entries between workers
+    RESPONSE_CACHE_DIR = 'cache'
+    CALENDAR_MAX_SLOTS = 2016  # a week of 5-minute slots
+    REPORT_MAX_DAYS = 366
+    SLOW_REQUEST_THRESHOLD_MS = 500
+    PROFILING_ENABLED = False  # allow per-request sampling with the X-Profile: 1 header
+    SEARCH_PAGE_SIZE = 20
+    SEARCH_MAX_PAGE_SIZE = 100
+    JSON_ENCODER = 'auto'  # orjson when installed, else the standard library; or 'orjson'/'json'
+    OVERDUE_POLICY = 'overdue'  # or 'complete' to close reservations once they run out
+    OVERDUE_GRACE_MINUTES = 30
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:260000'  # existing hashes are upgraded on the next login
+    PASSWORD_SALT_LENGTH = 16
+    PASSWORD_HASH_WORKERS = 2  # processes; 0 hashes on the request thread
+    PASSWORD_HASH_MAX_PENDING = 32  # hashes queued or running before requests are turned away
+    PASSWORD_HASH_TIMEOUT = 5.0  # seconds
+    LOGIN_ACCOUNT_LIMIT = 10  # attempts per minute per email address; 0 to disable
+    LOGIN_IP_LIMIT = 120  # attempts per minute per client address; 0 to disable
+    PROXY_FIX_X_FOR = 0  # reverse proxies whose X-Forwarded-For is trusted for the client address
+
+# Extensions are created unbound and attached to each app by create_app()
+db = SQLAlchemy()
+migrate = Migrate()
+cors = CORS()
+metrics = RequestMetrics()
+api = Blueprint('api', __name__, cli_group=None)
 
-db = SQLAlchemy(app)
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
 
 # Models
 class User(db.Model):
     __tablename__ = 'user'
-    userID = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    userID = db.Column(KeyType, primary_key=True, default=new_id)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
@@ -36,47 +92,770 @@ class User(db.Model):
 
 class Laboratory(db.Model):
     __tablename__ = 'laboratory'
-    labID = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    labID = db.Column(KeyType, primary_key=True, default=new_id)
     lab_name = db.Column(db.String(100), unique=True, nullable=False)
     equipment = db.relationship('LabEquipment', back_populates='laboratory')
 
 class LabEquipment(db.Model):
     __tablename__ = 'lab_equipment'
-    equipmentID = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    labID = db.Column(db.String(36), db.ForeignKey('laboratory.labID'), nullable=False)
+    equipmentID = db.Column(KeyType, primary_key=True, default=new_id)
+    labID = db.Column(KeyType, db.ForeignKey('laboratory.labID'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     status = db.Column(db.String(20), nullable=False, default='available')
     total_quantity = db.Column(db.Integer, nullable=False, default=1)
     available_quantity = db.Column(db.Integer, nullable=False, default=1)
+    capacity_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Bumped by every booking change
     laboratory = db.relationship('Laboratory', back_populates='equipment')
     reservations = db.relationship('Reservation', back_populates='equipment')
 
 class Reservation(db.Model):
     __tablename__ = 'reservation'
-    reservationID = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    userID = db.Column(db.String(36), db.ForeignKey('user.userID'), nullable=False)
-    equipmentID = db.Column(db.String(36), db.ForeignKey('lab_equipment.equipmentID'), nullable=False)
+    reservationID = db.Column(KeyType, primary_key=True, default=new_id)
+    userID = db.Column(KeyType, db.ForeignKey('user.userID'), nullable=False)
+    equipmentID = db.Column(KeyType, db.ForeignKey('lab_equipment.equipmentID'), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
     end_time = db.Column(db.DateTime, nullable=False)
-    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, approved, rejected, completed, cancelled
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, approved, overdue, rejected, returned, completed, cancelled
     quantity = db.Column(db.Integer, nullable=False, default=1)  # Number of equipment units reserved
     reason = db.Column(db.String(500))  # Student's reason for reservation
     admin_notes = db.Column(db.String(200))  # For admin to provide reason for rejection
     return_timestamp = db.Column(db.DateTime)  # When the equipment was returned
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Request time; approval queues are FIFO on it
     user = db.relationship('User', back_populates='reservations')
     equipment = db.relationship('LabEquipment', back_populates='reservations')
     notifications = db.relationship('Notification', back_populates='reservation')
+    __table_args__ = (
+        db.Index('ix_reservation_equipment_status_time', 'equipmentID', 'status', 'start_time', 'end_time'),
+        db.Index('ix_reservation_start', 'start_time', 'reservationID'),
+        db.Index('ix_reservation_status_start', 'status', 'start_time', 'reservationID'),
+        db.Index('ix_reservation_user_start', 'userID', 'start_time', 'reservationID'),
+        db.Index('ix_reservation_status_end', 'status', 'end_time'),
+        db.Index('ix_reservation_equipment_status_created', 'equipmentID', 'status', 'created_at', 'reservationID'),
+    )
 
 class Notification(db.Model):
     __tablename__ = 'notification'
-    notificationID = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    userID = db.Column(db.String(36), db.ForeignKey('user.userID'), nullable=False)
-    reservationID = db.Column(db.String(36), db.ForeignKey('reservation.reservationID'), nullable=False)
+    notificationID = db.Column(KeyType, primary_key=True, default=new_id)
+    userID = db.Column(KeyType, db.ForeignKey('user.userID'), nullable=False)
+    reservationID = db.Column(KeyType, db.ForeignKey('reservation.reservationID'), nullable=False)
     message = db.Column(db.String(200), nullable=False)
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user = db.relationship('User', back_populates='notifications')
     reservation = db.relationship('Reservation', back_populates='notifications')
+    __table_args__ = (
+        db.Index('ix_notification_user_created', 'userID', 'created_at', 'notificationID'),
+        db.Index('ix_notification_user_unread', 'userID', 'is_read'),
+        db.Index('ix_notification_read_created', 'is_read', 'created_at'),
+    )
+
+# Archive tables hold closed history moved out of the hot tables by `flask compact`.
+# Names are copied in so archived rows can be listed without joins.
+class ReservationArchive(db.Model):
+    __tablename__ = 'reservation_archive'
+    reservationID = db.Column(KeyType, primary_key=True)
+    userID = db.Column(KeyType, nullable=False)
+    equipmentID = db.Column(KeyType, nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(500))
+    admin_notes = db.Column(db.String(200))
+    return_timestamp = db.Column(db.DateTime)
+    user_name = db.Column(db.String(100))
+    equipment_name = db.Column(db.String(100))
+    laboratory_name = db.Column(db.String(100))
+    archived_at = db.Column(db.DateTime, nullable=False)
+    __table_args__ = (
+        db.Index('ix_reservation_archive_start', 'start_time', 'reservationID'),
+        db.Index('ix_reservation_archive_user_start', 'userID', 'start_time', 'reservationID'),
+    )
+
+class NotificationArchive(db.Model):
+    __tablename__ = 'notification_archive'
+    notificationID = db.Column(KeyType, primary_key=True)
+    userID = db.Column(KeyType, nullable=False)
+    reservationID = db.Column(KeyType, nullable=False)
+    message = db.Column(db.String(200), nullable=False)
+    is_read = db.Column(db.Boolean)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+    __table_args__ = (
+        db.Index('ix_notification_archive_user_created', 'userID', 'created_at', 'notificationID'),
+    )
+
+class CatalogVersion(db.Model):
+    __tablename__ = 'catalog_version'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class NotificationEvent(db.Model):
+    __tablename__ = 'notification_outbox'
+    eventID = db.Column(KeyType, primary_key=True, default=new_id)
+    event_type = db.Column(db.String(30), nullable=False)  # reservation_created, reservation_status
+    userID = db.Column(KeyType, db.ForeignKey('user.userID'), nullable=False)
+    reservationID = db.Column(KeyType, db.ForeignKey('reservation.reservationID'), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON context used to render the message
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    notificationID = db.Column(KeyType)  # Set once the Notification row is written
+    processed_at = db.Column(db.DateTime)  # When the Notification row was written
+    delivered_at = db.Column(db.DateTime)  # When every delivery backend accepted it
+    delivered_to = db.Column(db.String(100))  # Comma-separated backends that already accepted it
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    attempted_at = db.Column(db.DateTime)  # When delivery was last tried
+    last_error = db.Column(db.String(500))
+    __table_args__ = (
+        db.Index('ix_notification_outbox_pending', 'processed_at', 'created_at'),
+        db.Index('ix_notification_outbox_undelivered', 'delivered_at', 'processed_at'),
+    )
+
+# Daily utilization rollup, kept current by every reservation status change
+class UtilizationDaily(db.Model):
+    __tablename__ = 'utilization_daily'
+    equipmentID = db.Column(KeyType, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    labID = db.Column(KeyType)  # Copied in so lab reports need no join
+    approved = db.Column(db.Integer, nullable=False, default=0)
+    rejected = db.Column(db.Integer, nullable=False, default=0)
+    returned = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    late_returns = db.Column(db.Integer, nullable=False, default=0)
+    unit_hours = db.Column(db.Float, nullable=False, default=0)
+    __table_args__ = (
+        db.Index('ix_utilization_daily_day', 'day'),
+        db.Index('ix_utilization_daily_lab_day', 'labID', 'day'),
+    )
+
+# Full-text search indexes are created and dropped together with the tables
+event.listen(db.metadata, 'after_create', search.create_search_index)
+event.listen(db.metadata, 'before_drop', search.drop_search_index)
+
+# Equipment statuses accepted from imports
+EQUIPMENT_STATUSES = ('available', 'maintenance', 'unavailable')
+
+# Reservations in these states hold equipment capacity
+ACTIVE_RESERVATION_STATUSES = ('pending', 'approved')
+
+def load_active_reservations(equipment_id, start=None, end=None):
+    query = db.session.query(
+        Reservation.start_time,
+        Reservation.end_time,
+        Reservation.quantity
+    ).filter(
+        Reservation.equipmentID == equipment_id,
+        Reservation.status.in_(ACTIVE_RESERVATION_STATUSES)
+    )
+    if start is not None:
+        query = query.filter(Reservation.end_time > start)
+    if end is not None:
+        query = query.filter(Reservation.start_time < end)
+    return query.all()
+
+# Read-only availability views answer from per-process timelines tagged with
+# the item's capacity_version; write paths check capacity in the database.
+capacity_index = CapacityIndex(load_active_reservations)
+
+def lock_equipment(equipment_ids):
+    """Lock equipment rows for a booking change until the transaction ends.
+    
+    Bumping capacity_version takes the rows' write locks on PostgreSQL and
+    the database write lock on SQLite, so an overlap check that follows sees
+    every booking committed before it and no other writer can add one until
+    this transaction ends. It also invalidates every worker's cached
+    timelines. Rows are locked in key order so concurrent batches cannot
+    deadlock.
+    """
+    for equipment_id in sorted(set(equipment_ids)):
+        LabEquipment.query.filter(
+            LabEquipment.equipmentID == equipment_id
+        ).update({
+            LabEquipment.capacity_version: LabEquipment.capacity_version + 1
+        }, synchronize_session=False)
+
+def reserved_units(equipment_id, start, end):
+    """Peak units held by active reservations during ``[start, end)``, read from the database."""
+    timeline = CapacityTimeline()
+    for interval_start, interval_end, quantity in load_active_reservations(equipment_id, start, end):
+        timeline.add(interval_start, interval_end, quantity)
+    return timeline.peak(start, end)
+
+# Atomic state changes. Each helper issues one conditional UPDATE and reports
+# whether it applied, so concurrent workers can never both claim the same
+# reservation or take more units than are available.
+def transition_reservation(reservation, old_status, values):
+    updated = Reservation.query.filter(
+        Reservation.reservationID == reservation.reservationID,
+        Reservation.status == old_status
+    ).update(values, synchronize_session='evaluate')
+    return updated == 1
+
+def take_units(equipment_id, quantity):
+    updated = LabEquipment.query.filter(
+        LabEquipment.equipmentID == equipment_id,
+        LabEquipment.available_quantity >= quantity
+    ).update({
+        LabEquipment.available_quantity: LabEquipment.available_quantity - quantity
+    }, synchronize_session=False)
+    return updated == 1
+
+def release_units(equipment_id, quantity):
+    LabEquipment.query.filter(
+        LabEquipment.equipmentID == equipment_id
+    ).update({
+        LabEquipment.available_quantity: LabEquipment.available_quantity + quantity
+    }, synchronize_session=False)
+
+def increment_row(model, key, counters, **values):
+    """Add ``counters`` to the row whose primary key is ``key``, creating it if missing.
+    
+    A single INSERT ... ON CONFLICT DO UPDATE, so concurrent writers that
+    both find the row missing cannot collide on its primary key.
+    """
+    table = model.__table__
+    insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+    statement = insert(table).values(**key, **counters, **values)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=list(key),
+        set_={name: table.c[name] + statement.excluded[name] for name in counters}
+    ))
+
+# Notification outbox. Requests only record a compact event; the
+# drain-notifications worker renders, stores and delivers the messages.
+def notification_event(event_type, user_id, reservation_id, **context):
+    return {
+        'eventID': new_id(),
+        'event_type': event_type,
+        'userID': user_id,
+        'reservationID': reservation_id,
+        'payload': json.dumps(context),
+        'created_at': datetime.utcnow(),
+        'attempts': 0
+    }
+
+def enqueue_notification(event_type, user_id, reservation_id, **context):
+    db.session.add(NotificationEvent(**notification_event(event_type, user_id, reservation_id, **context)))
+
+def render_notification(event_type, context):
+    if event_type == 'reservation_created':
+        return f'Your reservation for {context["quantity"]} {context["equipment_name"]}(s) has been created and is pending approval.'
+    if event_type == 'reservation_overdue':
+        return f'Your reservation for {context["quantity"]} {context["equipment_name"]}(s) ended on {context["end_time"]} and is now overdue. Please return the equipment.'
+    
+    message = f'Your reservation for {context["quantity"]} {context["equipment_name"]}(s) has been {context["status"]}.'
+    if context.get('return_timestamp'):
+        message += f' Equipment was returned on {context["return_timestamp"]}.'
+    if context.get('admin_notes'):
+        message += f' {context["admin_notes"]}'
+    return message
+
+# Arbitrary key for the PostgreSQL advisory lock around notification inserts
+NOTIFICATION_INSERT_LOCK = 7007
+
+def lock_notification_inserts():
+    """Serialize notification inserts until the transaction ends.
+    
+    On SQLite the pending outbox updates already hold the database write
+    lock; PostgreSQL takes a transaction-scoped advisory lock.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(db.text('SELECT pg_advisory_xact_lock(:key)'), {'key': NOTIFICATION_INSERT_LOCK})
+
+def drain_notification_outbox(batch_size=200, backends=()):
+    """Process one batch of outbox events; returns (rendered, delivered)."""
+    now = datetime.utcnow()
+    
+    # Render pending events into Notification rows
+    events = NotificationEvent.query.filter(
+        NotificationEvent.processed_at.is_(None)
+    ).order_by(NotificationEvent.created_at).limit(batch_size).with_for_update(skip_locked=True).all()
+    
+    notification_rows = []
+    for event in events:
+        event.notificationID = new_id()
+        event.processed_at = now
+        notification_rows.append({
+            'notificationID': event.notificationID,
+            'userID': event.userID,
+            'reservationID': event.reservationID,
+            'message': render_notification(event.event_type, json.loads(event.payload)),
+            'is_read': False
+        })
+    if notification_rows:
+        # Clients page through notifications by (created_at, notificationID),
+        # so rows must become visible in created_at order. Stamp them only
+        # once this transaction holds the insert lock, right before committing.
+        db.session.flush()
+        lock_notification_inserts()
+        created_at = datetime.utcnow()
+        for row in notification_rows:
+            row['created_at'] = created_at
+        db.session.bulk_insert_mappings(Notification, notification_rows)
+    db.session.commit()
+    
+    # Hand rendered notifications to the delivery backends
+    retry_before = now - timedelta(seconds=current_app.config['NOTIFICATION_RETRY_DELAY'])
+    undelivered = NotificationEvent.query.filter(
+        NotificationEvent.processed_at.isnot(None),
+        NotificationEvent.delivered_at.is_(None),
+        NotificationEvent.attempts < current_app.config['NOTIFICATION_MAX_ATTEMPTS'],
+        or_(NotificationEvent.attempted_at.is_(None), NotificationEvent.attempted_at < retry_before)
+    ).order_by(NotificationEvent.created_at).limit(batch_size).with_for_update(skip_locked=True).all()
+    if not undelivered:
+        return len(notification_rows), 0
+    
+    emails = dict(db.session.query(User.userID, User.email).filter(
+        User.userID.in_({event.userID for event in undelivered})
+    ).all())
+    events = {event.notificationID: event for event in undelivered}
+    delivered_to = {
+        event.notificationID: set(filter(None, (event.delivered_to or '').split(',')))
+        for event in undelivered
+    }
+    errors = {}
+    
+    # Each backend only gets the messages it has not accepted yet, and one
+    # failing message or backend does not hold back the others
+    for backend in backends:
+        messages = [{
+            'notificationID': event.notificationID,
+            'userID': event.userID,
+            'email': emails.get(event.userID),
+            'message': render_notification(event.event_type, json.loads(event.payload)),
+            'created_at': event.created_at
+        } for event in undelivered if backend.name not in delivered_to[event.notificationID]]
+        if not messages:
+            continue
+        handled = set()
+        try:
+            for message, error in backend.deliver(messages):
+                handled.add(message['notificationID'])
+                if error:
+                    errors[message['notificationID']] = f'{backend.name}: {error}'
+                else:
+                    delivered_to[message['notificationID']].add(backend.name)
+        except Exception as e:
+            for message in messages:
+                if message['notificationID'] not in handled:
+                    errors[message['notificationID']] = f'{backend.name}: {str(e)}'
+    
+    delivered = 0
+    finished_at = datetime.utcnow()
+    for notification_id, event in events.items():
+        event.attempts += 1
+        event.attempted_at = finished_at
+        event.delivered_to = ','.join(sorted(delivered_to[notification_id])) or None
+        if notification_id in errors:
+            event.last_error = errors[notification_id][:500]
+        else:
+            event.delivered_at = finished_at
+            delivered += 1
+    db.session.commit()
+    return len(notification_rows), delivered
+
+# Archival. Each call moves one bounded batch in its own transaction, so an
+# interrupted compaction simply picks up where it stopped on the next run.
+CLOSED_RESERVATION_STATUSES = ('rejected', 'returned', 'completed', 'cancelled')
+
+def archive_notification_rows(condition, now):
+    columns = ['notificationID', 'userID', 'reservationID', 'message', 'is_read', 'created_at']
+    db.session.execute(NotificationArchive.__table__.insert().from_select(
+        columns + ['archived_at'],
+        select(*[getattr(Notification, column) for column in columns] + [literal(now, db.DateTime)]).where(condition)
+    ))
+    Notification.query.filter(condition).delete(synchronize_session=False)
+
+def archive_closed_reservations(cutoff, batch_size=1000):
+    """Move one batch of closed reservations that ended before ``cutoff``; returns the count.
+
+    Reservations whose outbox events are still waiting to be delivered stay
+    until the outbox is done with them.
+    """
+    undelivered = db.session.query(NotificationEvent.eventID).filter(
+        NotificationEvent.reservationID == Reservation.reservationID,
+        NotificationEvent.delivered_at.is_(None),
+        or_(
+            NotificationEvent.processed_at.is_(None),
+            NotificationEvent.attempts < current_app.config['NOTIFICATION_MAX_ATTEMPTS']
+        )
+    ).exists()
+    reservation_ids = [row.reservationID for row in db.session.query(Reservation.reservationID).filter(
+        Reservation.status.in_(CLOSED_RESERVATION_STATUSES),
+        Reservation.end_time < cutoff,
+        ~undelivered
+    ).order_by(Reservation.end_time).limit(batch_size)]
+    if not reservation_ids:
+        return 0
+    
+    now = datetime.utcnow()
+    # Notifications and outbox events reference the reservation, so they go
+    # first; the events left are delivered or have run out of attempts
+    archive_notification_rows(Notification.reservationID.in_(reservation_ids), now)
+    NotificationEvent.query.filter(
+        NotificationEvent.reservationID.in_(reservation_ids)
+    ).delete(synchronize_session=False)
+    
+    db.session.execute(ReservationArchive.__table__.insert().from_select(
+        ['reservationID', 'userID', 'equipmentID', 'start_time', 'end_time', 'status', 'quantity', 'reason',
+         'admin_notes', 'return_timestamp', 'user_name', 'equipment_name', 'laboratory_name', 'archived_at'],
+        select(
+            Reservation.reservationID, Reservation.userID, Reservation.equipmentID, Reservation.start_time,
+            Reservation.end_time, Reservation.status, Reservation.quantity, Reservation.reason,
+            Reservation.admin_notes, Reservation.return_timestamp, User.name, LabEquipment.name,
+            Laboratory.lab_name, literal(now, db.DateTime)
+        ).select_from(Reservation)
+        .outerjoin(User, User.userID == Reservation.userID)
+        .outerjoin(LabEquipment, LabEquipment.equipmentID == Reservation.equipmentID)
+        .outerjoin(Laboratory, Laboratory.labID == LabEquipment.labID)
+        .where(Reservation.reservationID.in_(reservation_ids))
+    ))
+    Reservation.query.filter(
+        Reservation.reservationID.in_(reservation_ids)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return len(reservation_ids)
+
+def archive_read_notifications(cutoff, batch_size=1000):
+    """Move one batch of read notifications created before ``cutoff``; returns the count."""
+    notification_ids = [row.notificationID for row in db.session.query(Notification.notificationID).filter(
+        Notification.is_read.is_(True),
+        Notification.created_at < cutoff
+    ).order_by(Notification.created_at).limit(batch_size)]
+    if not notification_ids:
+        return 0
+    
+    archive_notification_rows(Notification.notificationID.in_(notification_ids), datetime.utcnow())
+    db.session.commit()
+    return len(notification_ids)
+
+def purge_delivered_events(cutoff, batch_size=1000):
+    """Delete one batch of delivered outbox events created before ``cutoff``; returns the count."""
+    event_ids = [row.eventID for row in db.session.query(NotificationEvent.eventID).filter(
+        NotificationEvent.delivered_at.isnot(None),
+        NotificationEvent.created_at < cutoff
+    ).limit(batch_size)]
+    if not event_ids:
+        return 0
+    
+    NotificationEvent.query.filter(NotificationEvent.eventID.in_(event_ids)).delete(synchronize_session=False)
+    db.session.commit()
+    return len(event_ids)
+
+# Utilization rollup. Status changes apply the difference between a
+# reservation's old and new contributions in their own transaction;
+# `flask rebuild-utilization` recomputes a date range from scratch.
+def reservation_utilization(reservation):
+    return utilization.contribution(
+        reservation.status,
+        reservation.start_time,
+        reservation.end_time,
+        reservation.quantity,
+        reservation.return_timestamp
+    )
+
+def apply_utilization(equipment_id, lab_id, delta):
+    """Add ``{day: {counter: amount}}`` to the equipment item's rollup rows."""
+    for day, counters in delta.items():
+        # One upsert, so concurrent writers cannot both insert the day's row
+        increment_row(UtilizationDaily, {'equipmentID': equipment_id, 'day': day}, counters, labID=lab_id)
+
+def record_utilization(reservation, before):
+    """Apply the change from ``before`` to the reservation's current contribution."""
+    apply_utilization(
+        reservation.equipmentID,
+        reservation.equipment.labID if reservation.equipment else None,
+        utilization.difference(reservation_utilization(reservation), before)
+    )
+
+def rebuild_utilization(start_day=None, end_day=None, batch_size=1000):
+    """Recompute the rollup for ``[start_day, end_day]`` (every day when omitted); returns the row count.
+    
+    Live and archived reservations are both read, so compaction never loses history.
+    The rollup is locked against writes until the rebuild commits; status
+    changes made meanwhile wait and then apply their deltas on top of it.
+    """
+    stale = UtilizationDaily.query
+    if start_day:
+        stale = stale.filter(UtilizationDaily.day >= start_day)
+    if end_day:
+        stale = stale.filter(UtilizationDaily.day <= end_day)
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(db.text('LOCK TABLE utilization_daily IN EXCLUSIVE MODE'))
+    # On SQLite the delete takes the database write lock before anything is read
+    stale.delete(synchronize_session=False)
+    
+    range_start = datetime.combine(start_day, datetime.min.time()) if start_day else None
+    range_end = datetime.combine(end_day + timedelta(days=1), datetime.min.time()) if end_day else None
+    
+    totals = {}
+    lab_ids = {}
+    for model in (Reservation, ReservationArchive):
+        query = db.session.query(
+            model.equipmentID,
+            LabEquipment.labID,
+            model.status,
+            model.start_time,
+            model.end_time,
+            model.quantity,
+            model.return_timestamp
+        ).outerjoin(
+            LabEquipment, LabEquipment.equipmentID == model.equipmentID
+        ).filter(model.status.in_(utilization.ROLLUP_STATUSES))
+        if range_start:
+            query = query.filter(model.end_time >= range_start)
+        if range_end:
+            query = query.filter(model.start_time < range_end)
+        
+        for equipment_id, lab_id, status, start, end, quantity, returned_at in query.yield_per(batch_size):
+            lab_ids[equipment_id] = lab_id
+            utilization.accumulate(
+                totals.setdefault(equipment_id, {}),
+                utilization.contribution(status, start, end, quantity, returned_at)
+            )
+    
+    rows = []
+    for equipment_id, days in totals.items():
+        for day, counters in days.items():
+            if (start_day and day < start_day) or (end_day and day > end_day):
+                continue
+            rows.append(dict(
+                dict.fromkeys(utilization.COUNTERS, 0),
+                **counters,
+                equipmentID=equipment_id,
+                day=day,
+                labID=lab_ids[equipment_id]
+            ))
+    
+    for offset in range(0, len(rows), batch_size):
+        db.session.bulk_insert_mappings(UtilizationDaily, rows[offset:offset + batch_size])
+    db.session.commit()
+    return len(rows)
+
+# Overdue sweeper. Approved reservations that ran past their end time plus
+# a grace period are closed a batch at a time: one guarded UPDATE claims the
+# batch, each item gets its units back in one UPDATE and the notifications
+# are bulk-inserted into the outbox, all in a single transaction.
+OVERDUE_POLICIES = {
+    'overdue': 'overdue',
+    'complete': 'completed',
+}
+SWEEP_BATCH_ATTEMPTS = 5  # reads of a batch before the sweeper gives up until its next run
+
+def sweep_overdue_reservations(cutoff, policy='overdue', batch_size=500):
+    """Close one batch of approved reservations that ended before ``cutoff``; returns the count.
+
+    Gives up and returns 0 when the batch keeps changing while it is read.
+    """
+    status = OVERDUE_POLICIES[policy]
+    for _ in range(SWEEP_BATCH_ATTEMPTS):
+        rows = db.session.query(
+            Reservation.reservationID,
+            Reservation.userID,
+            Reservation.equipmentID,
+            Reservation.start_time,
+            Reservation.end_time,
+            Reservation.quantity,
+            LabEquipment.labID,
+            LabEquipment.name.label('equipment_name')
+        ).join(
+            LabEquipment, LabEquipment.equipmentID == Reservation.equipmentID
+        ).filter(
+            Reservation.status == 'approved',
+            Reservation.end_time < cutoff
+        ).order_by(Reservation.end_time).limit(batch_size).with_for_update(of=Reservation, skip_locked=True).all()
+        if not rows:
+            return 0
+        
+        updated = Reservation.query.filter(
+            Reservation.reservationID.in_([row.reservationID for row in rows]),
+            Reservation.status == 'approved'
+        ).update({'status': status}, synchronize_session=False)
+        if updated == len(rows):
+            break
+        # Part of the batch was returned or completed meanwhile; read it again
+        db.session.rollback()
+    else:
+        current_app.logger.warning(
+            'Overdue sweep gave up after %d attempts: the batch kept changing underneath it',
+            SWEEP_BATCH_ATTEMPTS
+        )
+        return 0
+    
+    units = {}
+    deltas = {}
+    lab_ids = {}
+    event_rows = []
+    for row in rows:
+        units[row.equipmentID] = units.get(row.equipmentID, 0) + row.quantity
+        lab_ids[row.equipmentID] = row.labID
+        utilization.accumulate(deltas.setdefault(row.equipmentID, {}), utilization.difference(
+            utilization.contribution(status, row.start_time, row.end_time, row.quantity),
+            utilization.contribution('approved', row.start_time, row.end_time, row.quantity)
+        ))
+        if status == 'overdue':
+            event_rows.append(notification_event(
+                'reservation_overdue',
+                row.userID,
+                row.reservationID,
+                quantity=row.quantity,
+                equipment_name=row.equipment_name,
+                end_time=row.end_time.strftime("%Y-%m-%d %H:%M:%S")
+            ))
+        else:
+            event_rows.append(notification_event(
+                'reservation_status',
+                row.userID,
+                row.reservationID,
+                quantity=row.quantity,
+                equipment_name=row.equipment_name,
+                status=status,
+                admin_notes='Closed automatically after its end time.',
+                return_timestamp=None
+            ))
+    
+    lock_equipment(units)
+    for equipment_id, quantity in units.items():
+        release_units(equipment_id, quantity)
+    for equipment_id, delta in deltas.items():
+        if delta:
+            apply_utilization(equipment_id, lab_ids[equipment_id], delta)
+    db.session.bulk_insert_mappings(NotificationEvent, event_rows)
+    bump_catalog_version()
+    db.session.commit()
+    return len(rows)
+
+# Catalog response cache. Every write that changes what the laboratory or
+# equipment listings show bumps the shared version in the same transaction,
+# which invalidates the cached bodies in every worker.
+
+def current_catalog_version():
+    return db.session.query(CatalogVersion.version).filter_by(id=1).scalar() or 0
+
+def bump_catalog_version():
+    increment_row(CatalogVersion, {'id': 1}, {'version': 1})
+
+def cached_catalog(name, build):
+    response_cache = current_app.extensions['response_cache']
+    version = current_catalog_version()
+    entry = response_cache.get(name, version)
+    if entry is None:
+        catalog = build()
+        with timed('json'):
+            body = dumps_json(catalog)
+        entry = response_cache.set(name, version, body)
+    etag, body = entry
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+# List filtering and pagination helpers. List endpoints select only the
+# columns they return, as plain rows, instead of hydrating ORM objects.
+RESERVATION_FIELDS = [
+    'reservationID', 'userID', 'equipmentID', 'start_time', 'end_time', 'status', 'quantity', 'reason',
+    'admin_notes', 'return_timestamp', 'user_name', 'equipment_name', 'laboratory_name'
+]
+
+def parse_datetime_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError as e:
+        raise ValueError(f'Invalid date format: {str(e)}')
+
+def parse_id_arg(name):
+    value = request.args.get(name)
+    return parse_id(value) if value else None
+
+def filter_reservations(query, model=Reservation):
+    status = request.args.get('status')
+    if status:
+        query = query.filter(model.status.in_(status.split(',')))
+    
+    equipment_id = parse_id_arg('equipmentID')
+    if equipment_id:
+        query = query.filter(model.equipmentID == equipment_id)
+    
+    lab_id = parse_id_arg('labID')
+    if lab_id:
+        lab_equipment = db.session.query(LabEquipment.equipmentID).filter(LabEquipment.labID == lab_id)
+        query = query.filter(model.equipmentID.in_(lab_equipment))
+    
+    # Time window: reservations overlapping [start_time, end_time)
+    start_dt = parse_datetime_arg('start_time')
+    if start_dt:
+        query = query.filter(model.end_time > start_dt)
+    end_dt = parse_datetime_arg('end_time')
+    if end_dt:
+        query = query.filter(model.start_time < end_dt)
+    
+    return query
+
+def wants_archive():
+    return request.args.get('archived', '').lower() in ('1', 'true', 'yes')
+
+def archived_reservations_response(user_id=None):
+    query = db.session.query(*[getattr(ReservationArchive, field) for field in RESERVATION_FIELDS])
+    if user_id:
+        query = query.filter(ReservationArchive.userID == user_id)
+    try:
+        query = filter_reservations(query, ReservationArchive)
+        reservations, next_cursor = keyset_page(
+            query,
+            ReservationArchive.start_time,
+            ReservationArchive.reservationID,
+            parse_limit(request.args.get('limit')),
+            request.args.get('cursor')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    items = []
+    for row in reservations:
+        item = dict(row._mapping)
+        item['user_name'] = item['user_name'] or 'Unknown User'
+        item['equipment_name'] = item['equipment_name'] or 'Unknown Equipment'
+        item['archived'] = True
+        items.append(item)
+    return paginated_response(items, next_cursor)
+
+# Large list bodies skip jsonify: rows go straight to the fast encoder,
+# which writes datetimes itself
+def dumps_json(value):
+    return current_app.extensions['json_encoder'](value)
+
+def json_response(payload, status=200):
+    with timed('json'):
+        body = dumps_json(payload)
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+def paginated_response(items, next_cursor):
+    response = json_response(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+# Authenticated principals, cached so protected routes skip the user lookup
+Principal = namedtuple('Principal', ['userID', 'name', 'email', 'role'])
+
+def load_principal(user_id):
+    principal_cache = current_app.extensions['principal_cache']
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        user = User.query.get(user_id)
+        if not user:
+            return None
+        principal = Principal(user.userID, user.name, user.email, user.role)
+        principal_cache.set(user_id, principal)
+    return principal
+
+# Drop cached principals whenever a user's row changes or is deleted
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_principal(mapper, connection, target):
+    if has_app_context():
+        current_app.extensions['principal_cache'].pop(target.userID)
 
 # Token required decorator
 def token_required(f):
@@ -87,32 +866,72 @@ def token_required(f):
             return jsonify({'message': 'Token is missing!'}), 401
         try:
             token = token.split(' ')[1]  # Remove 'Bearer ' prefix
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
-            current_user = User.query.get(data['userID'])
+            with timed('jwt'):
+                data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
+            current_user = load_principal(data['userID'])
+            if current_user is None:
+                raise LookupError('Unknown user')
         except:
             return jsonify({'message': 'Token is invalid!'}), 401
         return f(current_user, *args, **kwargs)
     return decorated
 
 # Login route
-@app.route('/api/login', methods=['POST'])
+def too_busy(message, status=503, retry_after=1):
+    response = jsonify({'message': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response
+
+@api.route('/api/login', methods=['POST'])
 def login():
     data = request.get_json()
     
     if not data or not data.get('email') or not data.get('password'):
         return jsonify({'message': 'Missing email or password'}), 400
+    if not isinstance(data['email'], str) or not isinstance(data['password'], str):
+        return jsonify({'message': 'Email and password must be strings'}), 400
+    
+    # Shed repeated attempts before doing any database or hashing work
+    ip_throttle = current_app.extensions['login_ip_throttle']
+    account_throttle = current_app.extensions['login_account_throttle']
+    account = data['email'].strip().lower()
+    retry_after = max(ip_throttle.acquire(request.remote_addr), account_throttle.acquire(account))
+    if retry_after:
+        return too_busy('Too many login attempts, please try again later', 429, retry_after)
     
     user = User.query.filter_by(email=data['email']).first()
     
-    if not user or not check_password_hash(user.password, data['password']):
+    if not user:
+        return jsonify({'message': 'Invalid email or password'}), 401
+    
+    hasher = current_app.extensions['password_hasher']
+    try:
+        with timed('password_hash'):
+            password_ok = hasher.verify(user.password, data['password'])
+    except HasherBusy:
+        # The password was never checked, so the attempt does not count
+        ip_throttle.refund(request.remote_addr)
+        account_throttle.refund(account)
+        return too_busy('Login is busy, please try again shortly')
+    if not password_ok:
         return jsonify({'message': 'Invalid email or password'}), 401
     
+    # Upgrade hashes made with older parameters while the plain password is at hand
+    if hasher.needs_rehash(user.password):
+        try:
+            with timed('password_hash'):
+                user.password = hasher.hash(data['password'])
+            db.session.commit()
+        except HasherBusy:
+            pass
+    
     token = jwt.encode({
         'userID': user.userID,
         'email': user.email,
         'role': user.role,
         'exp': datetime.utcnow() + timedelta(days=1)
-    }, app.config['SECRET_KEY'])
+    }, current_app.config['SECRET_KEY'])
     
     return jsonify({
         'token': token,
@@ -127,14 +946,14 @@ def login():
 # Routes
 
 # Frontend route
-@app.route('/')
+@api.route('/')
 def index():
     return render_template('index.html')
 
 # API Routes
 
 # User Routes
-@app.route('/api/users', methods=['GET'])
+@api.route('/api/users', methods=['GET'])
 @token_required
 def get_users(current_user):
     if current_user.role != 'admin':
@@ -148,7 +967,7 @@ def get_users(current_user):
         'role': user.role
     } for user in users])
 
-@app.route('/api/users', methods=['POST'])
+@api.route('/api/users', methods=['POST'])
 def create_user():
     data = request.get_json()
     
@@ -156,7 +975,11 @@ def create_user():
     if User.query.filter_by(email=data['email']).first():
         return jsonify({'error': 'User with this email already exists'}), 400
     
-    hashed_password = generate_password_hash(data['password'])
+    try:
+        with timed('password_hash'):
+            hashed_password = current_app.extensions['password_hasher'].hash(data['password'])
+    except HasherBusy:
+        return too_busy('Account creation is busy, please try again shortly')
     
     user = User(
         name=data['name'],
@@ -170,7 +993,7 @@ def create_user():
     
     return jsonify({'message': 'User created successfully', 'userID': user.userID}), 201
 
-@app.route('/api/users/<user_id>', methods=['GET'])
+@api.route('/api/users/<id:user_id>', methods=['GET'])
 def get_user(user_id):
     user = User.query.get_or_404(user_id)
     return jsonify({
@@ -181,23 +1004,32 @@ def get_user(user_id):
     })
 
 # Laboratory Routes
-@app.route('/api/laboratories', methods=['GET'])
+@api.route('/api/laboratories', methods=['GET'])
 def get_laboratories():
-    labs = Laboratory.query.all()
-    return jsonify([{
-        'labID': lab.labID,
-        'lab_name': lab.lab_name,
-        'equipment_count': len(lab.equipment),
-        'equipment': [{
-            'equipmentID': eq.equipmentID,
-            'name': eq.name,
-            'status': eq.status,
-            'total_quantity': eq.total_quantity,
-            'available_quantity': eq.available_quantity
-        } for eq in lab.equipment]
-    } for lab in labs])
+    return cached_catalog('laboratories', build_laboratories_catalog)
 
-@app.route('/api/laboratories', methods=['POST'])
+def build_laboratories_catalog():
+    labs = {lab_id: {
+        'labID': lab_id,
+        'lab_name': lab_name,
+        'equipment_count': 0,
+        'equipment': []
+    } for lab_id, lab_name in db.session.query(Laboratory.labID, Laboratory.lab_name)}
+    for row in db.session.query(
+        LabEquipment.labID,
+        LabEquipment.equipmentID,
+        LabEquipment.name,
+        LabEquipment.status,
+        LabEquipment.total_quantity,
+        LabEquipment.available_quantity
+    ):
+        lab = labs.get(row.labID)
+        if lab is not None:
+            lab['equipment'].append({key: value for key, value in row._mapping.items() if key != 'labID'})
+            lab['equipment_count'] += 1
+    return list(labs.values())
+
+@api.route('/api/laboratories', methods=['POST'])
 @token_required
 def create_laboratory(current_user):
     if current_user.role != 'admin':
@@ -211,6 +1043,7 @@ def create_laboratory(current_user):
     try:
         lab = Laboratory(lab_name=data['lab_name'])
         db.session.add(lab)
+        bump_catalog_version()
         db.session.commit()
         
         return jsonify({
@@ -226,28 +1059,31 @@ def create_laboratory(current_user):
         db.session.rollback()
         return jsonify({'error': 'Failed to create laboratory'}), 500
 
-@app.route('/api/laboratories/<lab_id>', methods=['DELETE'])
+@api.route('/api/laboratories/<id:lab_id>', methods=['DELETE'])
 def delete_laboratory(lab_id):
     lab = Laboratory.query.get_or_404(lab_id)
     db.session.delete(lab)
+    bump_catalog_version()
     db.session.commit()
     return jsonify({'message': 'Laboratory deleted successfully'})
 
 # Lab Equipment Routes
-@app.route('/api/equipment', methods=['GET'])
+@api.route('/api/equipment', methods=['GET'])
 def get_equipment():
-    equipment = LabEquipment.query.all()
-    return jsonify([{
-        'equipmentID': eq.equipmentID,
-        'name': eq.name,
-        'labID': eq.labID,
-        'lab_name': eq.laboratory.lab_name,
-        'status': eq.status,
-        'total_quantity': eq.total_quantity,
-        'available_quantity': eq.available_quantity
-    } for eq in equipment])
-
-@app.route('/api/equipment', methods=['POST'])
+    return cached_catalog('equipment', build_equipment_catalog)
+
+def build_equipment_catalog():
+    return [dict(row._mapping) for row in db.session.query(
+        LabEquipment.equipmentID,
+        LabEquipment.name,
+        LabEquipment.labID,
+        Laboratory.lab_name,
+        LabEquipment.status,
+        LabEquipment.total_quantity,
+        LabEquipment.available_quantity
+    ).join(Laboratory, Laboratory.labID == LabEquipment.labID)]
+
+@api.route('/api/equipment', methods=['POST'])
 @token_required
 def create_equipment(current_user):
     if current_user.role != 'admin':
@@ -262,7 +1098,11 @@ def create_equipment(current_user):
             return jsonify({'error': f'Missing required field: {field}'}), 400
     
     # Validate laboratory exists
-    lab = Laboratory.query.get(data['labID'])
+    try:
+        lab_id = parse_id(data['labID'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    lab = Laboratory.query.get(lab_id)
     if not lab:
         return jsonify({'error': 'Laboratory not found'}), 400
     
@@ -273,13 +1113,14 @@ def create_equipment(current_user):
     try:
         equipment = LabEquipment(
             name=data['name'],
-            labID=data['labID'],
+            labID=lab_id,
             total_quantity=data['total_quantity'],
             available_quantity=data['total_quantity'],
             status='available'
         )
         
         db.session.add(equipment)
+        bump_catalog_version()
         db.session.commit()
         
         return jsonify({
@@ -299,46 +1140,203 @@ def create_equipment(current_user):
         db.session.rollback()
         return jsonify({'error': 'Failed to create equipment'}), 500
 
-@app.route('/api/equipment/<equipment_id>', methods=['PUT'])
+# Bulk inventory import. Records are validated against laboratories loaded
+# once up front and inserted in batches, each in its own transaction.
+def equipment_import_row(record, lab_ids, labs_by_name):
+    """Validate one imported equipment record; returns ``(row, error)``."""
+    name = record.get('name')
+    if not name:
+        return None, 'Missing required field: name'
+    if not isinstance(name, str) or not name.strip():
+        return None, 'name must be a non-empty string'
+    
+    lab_name = record.get('lab_name')
+    lab_id = record.get('labID') or (labs_by_name.get(lab_name) if isinstance(lab_name, str) else None)
+    try:
+        lab_id = parse_id(lab_id) if lab_id else None
+    except ValueError as e:
+        return None, str(e)
+    if lab_id not in lab_ids:
+        return None, 'Laboratory not found'
+    
+    status = record.get('status') or 'available'
+    if status not in EQUIPMENT_STATUSES:
+        return None, f'status must be one of {", ".join(EQUIPMENT_STATUSES)}'
+    
+    # NDJSON values arrive typed: take whole numbers and numeric strings, never truncate a float
+    total_quantity = record.get('total_quantity') or 0
+    if isinstance(total_quantity, bool) or not isinstance(total_quantity, (int, str)):
+        return None, 'Total quantity must be a whole number'
+    try:
+        total_quantity = int(total_quantity)
+    except ValueError:
+        return None, 'Total quantity must be a whole number'
+    if total_quantity < 1:
+        return None, 'Total quantity must be at least 1'
+    
+    return {
+        'equipmentID': new_id(),
+        'labID': lab_id,
+        'name': name,
+        'status': status,
+        'total_quantity': total_quantity,
+        'available_quantity': total_quantity
+    }, None
+
+def import_equipment(lines, fmt, batch_size):
+    """Import equipment records from ``lines``; returns ``(imported, failed, errors)``."""
+    lab_ids = {lab_id for lab_id, in db.session.query(Laboratory.labID)}
+    labs_by_name = dict(db.session.query(Laboratory.lab_name, Laboratory.labID))
+    imported = failed = 0
+    errors = []
+    
+    for chunk in transfer.chunked(transfer.read_records(lines, fmt), batch_size):
+        rows = []
+        for line_number, record, error in chunk:
+            if error is None:
+                row, error = equipment_import_row(record, lab_ids, labs_by_name)
+            if error:
+                failed += 1
+                if len(errors) < current_app.config['IMPORT_MAX_ERRORS']:
+                    errors.append({'line': line_number, 'error': error})
+                continue
+            rows.append(row)
+        
+        if rows:
+            db.session.bulk_insert_mappings(LabEquipment, rows)
+            bump_catalog_version()
+            db.session.commit()
+            imported += len(rows)
+    
+    return imported, failed, errors
+
+@api.route('/api/equipment/import', methods=['POST'])
+@token_required
+def import_equipment_route(current_user):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    # Accept either a multipart upload named "file" or the raw request body
+    upload = request.files.get('file')
+    try:
+        fmt = transfer.detect_format(
+            request.args.get('format'),
+            upload.mimetype if upload else request.mimetype,
+            upload.filename if upload else None
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    lines = codecs.iterdecode(upload.stream if upload else request.stream, 'utf-8-sig')
+    try:
+        imported, failed, errors = import_equipment(lines, fmt, current_app.config['IMPORT_BATCH_SIZE'])
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({'error': 'File must be UTF-8 encoded'}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Error importing equipment')
+        return jsonify({'error': 'Failed to import equipment'}), 500
+    
+    return jsonify({
+        'message': f'{imported} equipment items imported',
+        'imported': imported,
+        'failed': failed,
+        'errors': errors
+    }), 201 if imported else 400
+
+@api.route('/api/equipment/<id:equipment_id>', methods=['PUT'])
 def update_equipment_status(equipment_id):
     equipment = LabEquipment.query.get_or_404(equipment_id)
     data = request.get_json()
     
     equipment.status = data['status']
+    bump_catalog_version()
     db.session.commit()
     
     return jsonify({'message': 'Equipment status updated successfully'})
 
-@app.route('/api/equipment/<equipment_id>', methods=['DELETE'])
+@api.route('/api/equipment/<id:equipment_id>', methods=['DELETE'])
 def delete_equipment(equipment_id):
     equipment = LabEquipment.query.get_or_404(equipment_id)
     db.session.delete(equipment)
+    bump_catalog_version()
     db.session.commit()
+    capacity_index.invalidate(equipment_id)
     return jsonify({'message': 'Equipment deleted successfully'})
 
 # Reservation Routes
-@app.route('/api/reservations', methods=['GET'])
+@api.route('/api/reservations', methods=['GET'])
 def get_reservations():
-    reservations = Reservation.query.all()
-    return jsonify([{
-        'reservationID': res.reservationID,
-        'userID': res.userID,
-        'equipmentID': res.equipmentID,
-        'start_time': res.start_time.isoformat(),
-        'end_time': res.end_time.isoformat(),
-        'status': res.status,
-        'quantity': res.quantity,
-        'reason': res.reason,
-        'admin_notes': res.admin_notes,
-        'return_timestamp': res.return_timestamp.isoformat() if res.return_timestamp else None,
-        'user_name': res.user.name if res.user else 'Unknown User',
-        'equipment_name': res.equipment.name if res.equipment else 'Unknown Equipment'
-    } for res in reservations])
-
-@app.route('/api/reservations', methods=['POST'])
+    if wants_archive():
+        return archived_reservations_response()
+    
+    try:
+        query = filter_reservations(db.session.query(
+            *[getattr(Reservation, field) for field in RESERVATION_FIELDS[:10]],
+            func.coalesce(User.name, 'Unknown User').label('user_name'),
+            func.coalesce(LabEquipment.name, 'Unknown Equipment').label('equipment_name')
+        ).select_from(Reservation).outerjoin(
+            User, User.userID == Reservation.userID
+        ).outerjoin(
+            LabEquipment, LabEquipment.equipmentID == Reservation.equipmentID
+        ))
+        reservations, next_cursor = keyset_page(
+            query,
+            Reservation.start_time,
+            Reservation.reservationID,
+            parse_limit(request.args.get('limit')),
+            request.args.get('cursor')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return paginated_response([dict(row._mapping) for row in reservations], next_cursor)
+
+# Full reservation history for audits, streamed from a server-side cursor
+@api.route('/api/reservations/export', methods=['GET'])
+@token_required
+def export_reservations(current_user):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    try:
+        fmt = transfer.detect_format(request.args.get('format', 'csv'))
+        if wants_archive():
+            model = ReservationArchive
+            query = db.session.query(*[getattr(ReservationArchive, field) for field in RESERVATION_FIELDS])
+        else:
+            model = Reservation
+            query = db.session.query(
+                *[getattr(Reservation, field) for field in RESERVATION_FIELDS[:10]],
+                User.name.label('user_name'),
+                LabEquipment.name.label('equipment_name'),
+                Laboratory.lab_name.label('laboratory_name')
+            ).select_from(Reservation).outerjoin(
+                User, User.userID == Reservation.userID
+            ).outerjoin(
+                LabEquipment, LabEquipment.equipmentID == Reservation.equipmentID
+            ).outerjoin(
+                Laboratory, Laboratory.labID == LabEquipment.labID
+            )
+        query = filter_reservations(query, model)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    rows = query.order_by(model.start_time, model.reservationID).execution_options(
+        stream_results=True
+    ).yield_per(current_app.config['EXPORT_BATCH_SIZE'])
+    
+    return current_app.response_class(
+        stream_with_context(transfer.write_records((row._mapping for row in rows), fmt, RESERVATION_FIELDS)),
+        mimetype=transfer.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename=reservations.{fmt}'}
+    )
+
+@api.route('/api/reservations', methods=['POST'])
 def create_reservation():
     data = request.get_json()
-    print("Received reservation data:", data)
+    current_app.logger.debug('Received reservation data: %s', data)
     
     # Validate required fields
     required_fields = ['userID', 'equipmentID', 'start_time', 'end_time', 'reason', 'quantity']
@@ -346,39 +1344,45 @@ def create_reservation():
         if field not in data:
             return jsonify({'error': f'Missing required field: {field}'}), 400
     
+    try:
+        user_id = parse_id(data['userID'])
+        equipment_id = parse_id(data['equipmentID'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not db.session.query(User.userID).filter_by(userID=user_id).first():
+        return jsonify({'error': 'User not found'}), 400
+    
     try:
         # Parse datetime strings
         start_time = datetime.fromisoformat(data['start_time'].replace('Z', '+00:00'))
         end_time = datetime.fromisoformat(data['end_time'].replace('Z', '+00:00'))
         
-        # Get equipment and check availability
-        equipment = LabEquipment.query.get(data['equipmentID'])
-        if not equipment:
-            return jsonify({'error': 'Equipment not found'}), 400
-        
         quantity = int(data['quantity'])
         if quantity <= 0:
             return jsonify({'error': 'Quantity must be greater than 0'}), 400
         
+        # Lock the item first so the checks below cannot race another booking
+        lock_equipment([equipment_id])
+        equipment = LabEquipment.query.get(equipment_id)
+        if not equipment:
+            db.session.rollback()
+            return jsonify({'error': 'Equipment not found'}), 400
+        
         if equipment.available_quantity < quantity:
+            db.session.rollback()
             return jsonify({'error': f'Only {equipment.available_quantity} units available'}), 400
         
-        # Check for conflicting reservations
-        conflicts = Reservation.query.filter(
-            Reservation.equipmentID == data['equipmentID'],
-            Reservation.status.in_(['pending', 'approved']),
-            ((Reservation.start_time <= start_time) & (Reservation.end_time > start_time)) |
-            ((Reservation.start_time < end_time) & (Reservation.end_time >= end_time)) |
-            ((Reservation.start_time >= start_time) & (Reservation.end_time <= end_time))
-        ).count()
+        # Check peak units already held by overlapping reservations
+        units_in_use = reserved_units(equipment.equipmentID, start_time, end_time)
         
-        if conflicts >= equipment.available_quantity:
+        if units_in_use + quantity > equipment.total_quantity:
+            db.session.rollback()
             return jsonify({'error': 'No available units during the requested time slot'}), 400
         
         # Create new reservation
         reservation = Reservation(
-            userID=data['userID'],
-            equipmentID=data['equipmentID'],
+            userID=user_id,
+            equipmentID=equipment_id,
             start_time=start_time,
             end_time=end_time,
             status='pending',
@@ -389,27 +1393,171 @@ def create_reservation():
         db.session.add(reservation)
         db.session.flush()
         
-        # Create notification
-        notification = Notification(
-            userID=data['userID'],
-            reservationID=reservation.reservationID,
-            message=f'Your reservation for {quantity} {equipment.name}(s) has been created and is pending approval.',
-            is_read=False
+        enqueue_notification(
+            'reservation_created',
+            user_id,
+            reservation.reservationID,
+            quantity=quantity,
+            equipment_name=equipment.name
         )
-        
-        db.session.add(notification)
         db.session.commit()
         
         return jsonify({'message': 'Reservation created successfully', 'reservationID': reservation.reservationID}), 201
         
     except ValueError as e:
+        db.session.rollback()
         return jsonify({'error': f'Invalid date format: {str(e)}'}), 400
     except Exception as e:
         db.session.rollback()
-        print(f"Error creating reservation: {str(e)}")
+        current_app.logger.exception('Error creating reservation')
         return jsonify({'error': 'Failed to create reservation'}), 500
 
-@app.route('/api/reservations/<reservation_id>/status', methods=['PUT'])
+@api.route('/api/reservations/batch', methods=['POST'])
+def create_reservations_batch():
+    data = request.get_json()
+    items = data.get('reservations') if isinstance(data, dict) else None
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Missing reservations list'}), 400
+    if len(items) > current_app.config['RESERVATION_BATCH_LIMIT']:
+        return jsonify({'error': f'At most {current_app.config["RESERVATION_BATCH_LIMIT"]} reservations per batch'}), 400
+    
+    required_fields = ['userID', 'equipmentID', 'start_time', 'end_time', 'reason', 'quantity']
+    results = [None] * len(items)
+    requests_by_equipment = {}
+    
+    # Validate each item and group the valid ones by equipment
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = {'index': index, 'error': 'Reservation must be an object'}
+            continue
+        if 'userID' not in item and data.get('userID'):
+            item = dict(item, userID=data['userID'])
+        
+        missing = next((field for field in required_fields if field not in item), None)
+        if missing:
+            results[index] = {'index': index, 'error': f'Missing required field: {missing}'}
+            continue
+        
+        try:
+            item = dict(item, userID=parse_id(item['userID']), equipmentID=parse_id(item['equipmentID']))
+        except ValueError as e:
+            results[index] = {'index': index, 'error': str(e)}
+            continue
+        
+        try:
+            start_time = datetime.fromisoformat(item['start_time'].replace('Z', '+00:00'))
+            end_time = datetime.fromisoformat(item['end_time'].replace('Z', '+00:00'))
+        except (AttributeError, ValueError) as e:
+            results[index] = {'index': index, 'error': f'Invalid date format: {str(e)}'}
+            continue
+        
+        try:
+            quantity = int(item['quantity'])
+        except (TypeError, ValueError):
+            results[index] = {'index': index, 'error': 'Quantity must be an integer'}
+            continue
+        if quantity <= 0:
+            results[index] = {'index': index, 'error': 'Quantity must be greater than 0'}
+            continue
+        
+        requests_by_equipment.setdefault(item['equipmentID'], []).append(
+            (index, item, start_time, end_time, quantity)
+        )
+    
+    user_ids = {item['userID'] for group in requests_by_equipment.values() for _, item, _, _, _ in group}
+    known_users = {user_id for user_id, in db.session.query(User.userID).filter(User.userID.in_(list(user_ids)))}
+    
+    equipment_ids = list(requests_by_equipment)
+    lock_equipment(equipment_ids)
+    equipment_by_id = {
+        eq.equipmentID: eq
+        for eq in LabEquipment.query.filter(LabEquipment.equipmentID.in_(equipment_ids)).all()
+    }
+    
+    # Build capacity timelines for every requested item in one pass over the
+    # reservations overlapping the batch
+    timelines = {equipment_id: CapacityTimeline() for equipment_id in equipment_by_id}
+    windows = [(start_time, end_time) for group in requests_by_equipment.values() for _, _, start_time, end_time, _ in group]
+    if equipment_by_id:
+        existing = db.session.query(
+            Reservation.equipmentID,
+            Reservation.start_time,
+            Reservation.end_time,
+            Reservation.quantity
+        ).filter(
+            Reservation.equipmentID.in_(list(equipment_by_id)),
+            Reservation.status.in_(ACTIVE_RESERVATION_STATUSES),
+            Reservation.start_time < max(end for _, end in windows),
+            Reservation.end_time > min(start for start, _ in windows)
+        )
+        for equipment_id, start, end, quantity in existing:
+            timelines[equipment_id].add(start, end, quantity)
+    
+    reservation_rows = []
+    event_rows = []
+    created_at = datetime.utcnow()
+    for equipment_id, group in requests_by_equipment.items():
+        equipment = equipment_by_id.get(equipment_id)
+        timeline = timelines.get(equipment_id)
+        for index, item, start_time, end_time, quantity in group:
+            if item['userID'] not in known_users:
+                results[index] = {'index': index, 'error': 'User not found'}
+                continue
+            if not equipment:
+                results[index] = {'index': index, 'error': 'Equipment not found'}
+                continue
+            if equipment.available_quantity < quantity:
+                results[index] = {'index': index, 'error': f'Only {equipment.available_quantity} units available'}
+                continue
+            if timeline.peak(start_time, end_time) + quantity > equipment.total_quantity:
+                results[index] = {'index': index, 'error': 'No available units during the requested time slot'}
+                continue
+            
+            # Later items in the batch see the capacity taken by earlier ones
+            timeline.add(start_time, end_time, quantity)
+            reservation_id = new_id()
+            reservation_rows.append({
+                'reservationID': reservation_id,
+                'userID': item['userID'],
+                'equipmentID': equipment_id,
+                'start_time': start_time,
+                'end_time': end_time,
+                'status': 'pending',
+                'reason': item['reason'],
+                'quantity': quantity,
+                'created_at': created_at
+            })
+            event_rows.append(notification_event(
+                'reservation_created',
+                item['userID'],
+                reservation_id,
+                quantity=quantity,
+                equipment_name=equipment.name
+            ))
+            results[index] = {'index': index, 'reservationID': reservation_id}
+    
+    if reservation_rows:
+        try:
+            db.session.bulk_insert_mappings(Reservation, reservation_rows)
+            db.session.bulk_insert_mappings(NotificationEvent, event_rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.exception('Error creating reservations')
+            return jsonify({'error': 'Failed to create reservations'}), 500
+    else:
+        db.session.rollback()
+    
+    created = len(reservation_rows)
+    return jsonify({
+        'message': f'{created} of {len(items)} reservations created',
+        'created': created,
+        'failed': len(items) - created,
+        'results': results
+    }), 201 if created else 400
+
+@api.route('/api/reservations/<id:reservation_id>/status', methods=['PUT'])
 @token_required
 def update_reservation_status(current_user, reservation_id):
     if current_user.role != 'admin':
@@ -423,48 +1571,59 @@ def update_reservation_status(current_user, reservation_id):
     if not reservation:
         return jsonify({'error': 'Reservation not found'}), 404
     
-    if reservation.status != 'pending' and data['status'] == 'returned' and reservation.status != 'approved':
-        return jsonify({'error': 'Can only mark approved reservations as returned'}), 400
+    if reservation.status != 'pending' and data['status'] == 'returned' and reservation.status not in ('approved', 'overdue'):
+        return jsonify({'error': 'Can only mark approved or overdue reservations as returned'}), 400
     
     if reservation.status != 'pending' and data['status'] in ['approved', 'rejected']:
         return jsonify({'error': 'Can only update pending reservations'}), 400
     
     try:
         old_status = reservation.status
-        reservation.status = data['status']
-        reservation.admin_notes = data.get('admin_notes', '')
+        before = reservation_utilization(reservation)
+        values = {
+            'status': data['status'],
+            'admin_notes': data.get('admin_notes', '')
+        }
         
         # Set return timestamp if status is returned
         if data['status'] == 'returned':
-            reservation.return_timestamp = datetime.utcnow()
+            values['return_timestamp'] = datetime.utcnow()
+        
+        # Claim the reservation only if nobody changed its status since we read it
+        if not transition_reservation(reservation, old_status, values):
+            db.session.rollback()
+            return jsonify({'error': 'Reservation was updated by another request'}), 409
         
         # Update equipment availability if approved
         if data['status'] == 'approved':
-            equipment = LabEquipment.query.get(reservation.equipmentID)
-            if equipment.available_quantity < reservation.quantity:
+            if not take_units(reservation.equipmentID, reservation.quantity):
+                db.session.rollback()
+                equipment = LabEquipment.query.get(reservation.equipmentID)
                 return jsonify({'error': f'Only {equipment.available_quantity} units available'}), 400
-            equipment.available_quantity -= reservation.quantity
-        # Return equipment to available quantity if returned
-        elif data['status'] == 'returned':
-            equipment = LabEquipment.query.get(reservation.equipmentID)
-            equipment.available_quantity += reservation.quantity
+            bump_catalog_version()
+        # Return equipment to available quantity if it was handed out
+        # (the overdue sweeper already released it for overdue reservations)
+        elif data['status'] == 'returned' and old_status == 'approved':
+            release_units(reservation.equipmentID, reservation.quantity)
+            bump_catalog_version()
+        
+        # Rejected and returned reservations release their capacity
+        if old_status in ACTIVE_RESERVATION_STATUSES and data['status'] not in ACTIVE_RESERVATION_STATUSES:
+            lock_equipment([reservation.equipmentID])
+        
+        record_utilization(reservation, before)
         
-        # Create notification
         status_message = data['status']
-        notification_message = f'Your reservation for {reservation.quantity} {reservation.equipment.name}(s) has been {status_message}.'
-        if data['status'] == 'returned':
-            notification_message += f' Equipment was returned on {reservation.return_timestamp.strftime("%Y-%m-%d %H:%M:%S")}.'
-        if reservation.admin_notes:
-            notification_message += f' {reservation.admin_notes}'
-            
-        notification = Notification(
-            userID=reservation.userID,
-            reservationID=reservation.reservationID,
-            message=notification_message,
-            is_read=False
+        enqueue_notification(
+            'reservation_status',
+            reservation.userID,
+            reservation.reservationID,
+            quantity=reservation.quantity,
+            equipment_name=reservation.equipment.name,
+            status=status_message,
+            admin_notes=reservation.admin_notes,
+            return_timestamp=reservation.return_timestamp.strftime("%Y-%m-%d %H:%M:%S") if reservation.return_timestamp else None
         )
-        
-        db.session.add(notification)
         db.session.commit()
         
         return jsonify({
@@ -477,7 +1636,170 @@ def update_reservation_status(current_user, reservation_id):
         db.session.rollback()
         return jsonify({'error': 'Failed to update reservation status'}), 500
 
-@app.route('/api/reservations/<reservation_id>/complete', methods=['PUT'])
+# Bulk approval. Pending reservations are ordered by the chosen policy and
+# admitted greedily against each item's approved bookings and free units;
+# whatever does not fit is rejected or left pending on the waitlist.
+APPROVAL_ORDERS = ('fifo', 'earliest_end', 'priority')
+
+@api.route('/api/reservations/approve-batch', methods=['POST'])
+@token_required
+def approve_reservations_batch(current_user):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    data = request.get_json() or {}
+    order = data.get('order', 'fifo')
+    if order not in APPROVAL_ORDERS:
+        return jsonify({'error': f'order must be one of {", ".join(APPROVAL_ORDERS)}'}), 400
+    overflow_action = data.get('overflow', 'waitlist')
+    if overflow_action not in ('waitlist', 'reject'):
+        return jsonify({'error': 'overflow must be waitlist or reject'}), 400
+    try:
+        priority_values = {key: int(value) for key, value in (data.get('priorities') or {}).items()}
+    except (AttributeError, TypeError, ValueError):
+        return jsonify({'error': 'priorities must map reservation IDs to integers'}), 400
+    skipped = []
+    priorities = {}
+    for key, value in priority_values.items():
+        try:
+            priorities[parse_id(key)] = value
+        except ValueError as e:
+            skipped.append({'reservationID': key, 'error': str(e)})
+    
+    limit = current_app.config['APPROVAL_BATCH_LIMIT']
+    query = Reservation.query.options(joinedload(Reservation.equipment)).filter(Reservation.status == 'pending')
+    if data.get('reservationIDs') is not None:
+        reservation_ids = data['reservationIDs']
+        if not isinstance(reservation_ids, list) or not reservation_ids:
+            return jsonify({'error': 'reservationIDs must be a non-empty list'}), 400
+        if len(reservation_ids) > limit:
+            return jsonify({'error': f'At most {limit} reservations per batch'}), 400
+        requested = {}
+        for reservation_id in reservation_ids:
+            try:
+                requested.setdefault(parse_id(reservation_id), reservation_id)
+            except ValueError as e:
+                skipped.append({'reservationID': reservation_id, 'error': str(e)})
+        pending = query.filter(Reservation.reservationID.in_(list(requested))).all()
+        found = {res.reservationID for res in pending}
+        skipped += [
+            {'reservationID': reservation_id, 'error': 'Reservation not found or not pending'}
+            for key, reservation_id in requested.items() if key not in found
+        ]
+    elif data.get('equipmentID'):
+        try:
+            equipment_id = parse_id(data['equipmentID'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        # Oldest requests in the queue first
+        pending = query.filter(
+            Reservation.equipmentID == equipment_id
+        ).order_by(Reservation.created_at, Reservation.reservationID).limit(limit).all()
+    else:
+        return jsonify({'error': 'Provide reservationIDs or equipmentID'}), 400
+    
+    sort_keys = {
+        'fifo': lambda res: (res.created_at, res.reservationID),
+        'earliest_end': lambda res: (res.end_time, res.created_at, res.reservationID),
+        'priority': lambda res: (-priorities.get(res.reservationID, 0), res.created_at, res.reservationID)
+    }
+    requests_by_equipment = {}
+    for res in sorted(pending, key=sort_keys[order]):
+        requests_by_equipment.setdefault(res.equipmentID, []).append(res)
+    
+    # Units already committed to approved reservations, for every item in one query
+    lock_equipment(requests_by_equipment)
+    timelines = {equipment_id: CapacityTimeline() for equipment_id in requests_by_equipment}
+    approved_intervals = db.session.query(
+        Reservation.equipmentID,
+        Reservation.start_time,
+        Reservation.end_time,
+        Reservation.quantity
+    ).filter(
+        Reservation.equipmentID.in_(list(requests_by_equipment)),
+        Reservation.status == 'approved'
+    )
+    for equipment_id, start, end, quantity in approved_intervals:
+        timelines[equipment_id].add(start, end, quantity)
+    
+    approved = []
+    overflow = []
+    units_by_equipment = {}
+    for equipment_id, group in requests_by_equipment.items():
+        equipment = group[0].equipment
+        by_id = {res.reservationID: res for res in group}
+        admitted, rest = allocate(
+            [(res.reservationID, res.start_time, res.end_time, res.quantity) for res in group],
+            timelines[equipment_id],
+            equipment.total_quantity,
+            equipment.available_quantity
+        )
+        approved += [by_id[reservation_id] for reservation_id in admitted]
+        overflow += [by_id[reservation_id] for reservation_id in rest]
+        if admitted:
+            units_by_equipment[equipment_id] = sum(by_id[reservation_id].quantity for reservation_id in admitted)
+    rejected = overflow if overflow_action == 'reject' else []
+    
+    admin_notes = data.get('admin_notes', '')
+    reject_notes = data.get('reject_notes', 'Not enough units are available for the requested time.')
+    try:
+        for reservations, status, notes in [(approved, 'approved', admin_notes), (rejected, 'rejected', reject_notes)]:
+            if not reservations:
+                continue
+            # Claim every reservation at once; any that changed since we read them void the batch
+            updated = Reservation.query.filter(
+                Reservation.reservationID.in_([res.reservationID for res in reservations]),
+                Reservation.status == 'pending'
+            ).update({'status': status, 'admin_notes': notes}, synchronize_session=False)
+            if updated != len(reservations):
+                db.session.rollback()
+                return jsonify({'error': 'Some reservations were updated by another request'}), 409
+        
+        for equipment_id, units in units_by_equipment.items():
+            if not take_units(equipment_id, units):
+                db.session.rollback()
+                return jsonify({'error': 'Equipment availability changed during approval'}), 409
+        
+        deltas = {}
+        event_rows = []
+        for reservations, status, notes in [(approved, 'approved', admin_notes), (rejected, 'rejected', reject_notes)]:
+            for res in reservations:
+                utilization.accumulate(
+                    deltas.setdefault(res.equipmentID, {}),
+                    utilization.contribution(status, res.start_time, res.end_time, res.quantity)
+                )
+                event_rows.append(notification_event(
+                    'reservation_status',
+                    res.userID,
+                    res.reservationID,
+                    quantity=res.quantity,
+                    equipment_name=res.equipment.name,
+                    status=status,
+                    admin_notes=notes,
+                    return_timestamp=None
+                ))
+        for equipment_id, delta in deltas.items():
+            apply_utilization(equipment_id, requests_by_equipment[equipment_id][0].equipment.labID, delta)
+        if event_rows:
+            db.session.bulk_insert_mappings(NotificationEvent, event_rows)
+        if approved:
+            bump_catalog_version()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Error approving reservations')
+        return jsonify({'error': 'Failed to approve reservations'}), 500
+    
+    return jsonify({
+        'message': f'{len(approved)} approved, {len(rejected)} rejected, '
+                   f'{len(overflow) - len(rejected)} waitlisted',
+        'approved': [res.reservationID for res in approved],
+        'rejected': [res.reservationID for res in rejected],
+        'waitlisted': [res.reservationID for res in overflow if overflow_action == 'waitlist'],
+        'skipped': skipped
+    }), 200
+
+@api.route('/api/reservations/<id:reservation_id>/complete', methods=['PUT'])
 @token_required
 def complete_reservation(current_user, reservation_id):
     reservation = Reservation.query.get(reservation_id)
@@ -488,15 +1810,25 @@ def complete_reservation(current_user, reservation_id):
     if current_user.userID != reservation.userID and current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    if reservation.status != 'approved':
-        return jsonify({'error': 'Can only complete approved reservations'}), 400
+    if reservation.status not in ('approved', 'overdue'):
+        return jsonify({'error': 'Can only complete approved or overdue reservations'}), 400
     
     try:
-        reservation.status = 'completed'
+        old_status = reservation.status
+        before = reservation_utilization(reservation)
+        if not transition_reservation(reservation, old_status, {
+            'status': 'completed',
+            'return_timestamp': datetime.utcnow()
+        }):
+            db.session.rollback()
+            return jsonify({'error': 'Reservation was updated by another request'}), 409
         
-        # Return equipment to available quantity
-        equipment = LabEquipment.query.get(reservation.equipmentID)
-        equipment.available_quantity += 1
+        # Return equipment to available quantity; the overdue sweeper already did for overdue ones
+        if old_status == 'approved':
+            release_units(reservation.equipmentID, reservation.quantity)
+            lock_equipment([reservation.equipmentID])
+            bump_catalog_version()
+        record_utilization(reservation, before)
         
         db.session.commit()
         return jsonify({'message': 'Reservation completed successfully'}), 200
@@ -505,36 +1837,267 @@ def complete_reservation(current_user, reservation_id):
         db.session.rollback()
         return jsonify({'error': 'Failed to complete reservation'}), 500
 
-@app.route('/api/users/<user_id>/reservations', methods=['GET'])
+@api.route('/api/users/<id:user_id>/reservations', methods=['GET'])
 def get_user_reservations(user_id):
-    reservations = Reservation.query.filter_by(userID=user_id).all()
-    return jsonify([{
-        'reservationID': res.reservationID,
-        'equipmentID': res.equipmentID,
-        'start_time': res.start_time.isoformat(),
-        'end_time': res.end_time.isoformat(),
-        'status': res.status,
-        'quantity': res.quantity,
-        'reason': res.reason,
-        'admin_notes': res.admin_notes,
-        'return_timestamp': res.return_timestamp.isoformat() if res.return_timestamp else None,
-        'equipment_name': res.equipment.name,
-        'laboratory_name': res.equipment.laboratory.lab_name
-    } for res in reservations])
+    if wants_archive():
+        return archived_reservations_response(user_id)
+    
+    try:
+        query = filter_reservations(db.session.query(
+            Reservation.reservationID,
+            Reservation.equipmentID,
+            Reservation.start_time,
+            Reservation.end_time,
+            Reservation.status,
+            Reservation.quantity,
+            Reservation.reason,
+            Reservation.admin_notes,
+            Reservation.return_timestamp,
+            LabEquipment.name.label('equipment_name'),
+            Laboratory.lab_name.label('laboratory_name')
+        ).outerjoin(
+            LabEquipment, LabEquipment.equipmentID == Reservation.equipmentID
+        ).outerjoin(
+            Laboratory, Laboratory.labID == LabEquipment.labID
+        ).filter(Reservation.userID == user_id))
+        reservations, next_cursor = keyset_page(
+            query,
+            Reservation.start_time,
+            Reservation.reservationID,
+            parse_limit(request.args.get('limit')),
+            request.args.get('cursor')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return paginated_response([dict(row._mapping) for row in reservations], next_cursor)
 
 # Notification Routes
-@app.route('/api/notifications/<user_id>', methods=['GET'])
-def get_user_notifications(user_id):
-    notifications = Notification.query.filter_by(userID=user_id).order_by(Notification.created_at.desc()).all()
-    return jsonify([{
+def serialize_notification(notif):
+    return {
         'notificationID': notif.notificationID,
         'message': notif.message,
-        'timestamp': notif.created_at.isoformat(),
+        'timestamp': notif.created_at,
         'reservationID': notif.reservationID
-    } for notif in notifications])
+    }
+
+def notification_cursor(notif):
+    return encode_cursor(notif.created_at, notif.notificationID)
+
+def newer_notifications(user_id, since):
+    query = db.session.query(
+        Notification.notificationID,
+        Notification.message,
+        Notification.created_at,
+        Notification.reservationID
+    ).filter(Notification.userID == user_id)
+    if since:
+        query = query.filter(after_cursor(Notification.created_at, Notification.notificationID, since))
+    return query
+
+def notification_etag(user_id):
+    # Row count and newest timestamp change whenever the user's list does
+    count, latest = db.session.query(
+        func.count(Notification.notificationID),
+        func.max(Notification.created_at)
+    ).filter(Notification.userID == user_id).one()
+    state = f'{user_id}:{count}:{latest.isoformat() if latest else ""}:{request.query_string.decode()}'
+    return hashlib.sha1(state.encode()).hexdigest()
+
+def wait_for_notifications(user_id, since, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if newer_notifications(user_id, since).first() is not None:
+            return True
+        # End the read transaction so the next check sees fresh commits
+        db.session.rollback()
+        time.sleep(current_app.config['NOTIFICATION_POLL_INTERVAL'])
+    return False
+
+@api.route('/api/notifications/<id:user_id>', methods=['GET'])
+def get_user_notifications(user_id):
+    if wants_archive():
+        return get_archived_notifications(user_id)
+    
+    since = request.args.get('since')
+    try:
+        if since:
+            decode_cursor(since)
+        wait = min(float(request.args.get('wait', 0)), current_app.config['NOTIFICATION_LONG_POLL_MAX'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Long-poll: hold the request until something newer than `since` arrives
+    if since and wait > 0:
+        wait_for_notifications(user_id, since, wait)
+    
+    etag = notification_etag(user_id)
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    
+    try:
+        query = newer_notifications(user_id, since)
+        start_dt = parse_datetime_arg('start_time')
+        if start_dt:
+            query = query.filter(Notification.created_at >= start_dt)
+        end_dt = parse_datetime_arg('end_time')
+        if end_dt:
+            query = query.filter(Notification.created_at < end_dt)
+        notifications, next_cursor = keyset_page(
+            query,
+            Notification.created_at,
+            Notification.notificationID,
+            parse_limit(request.args.get('limit')),
+            request.args.get('cursor'),
+            descending=True
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = paginated_response([serialize_notification(notif) for notif in notifications], next_cursor)
+    response.set_etag(etag)
+    # Newest row first, so its cursor is what the client should poll `since` next
+    latest_cursor = notification_cursor(notifications[0]) if notifications and not request.args.get('cursor') else since
+    if latest_cursor:
+        response.headers['X-Latest-Cursor'] = latest_cursor
+    return response
+
+def get_archived_notifications(user_id):
+    try:
+        notifications, next_cursor = keyset_page(
+            db.session.query(
+                NotificationArchive.notificationID,
+                NotificationArchive.message,
+                NotificationArchive.created_at,
+                NotificationArchive.reservationID
+            ).filter(NotificationArchive.userID == user_id),
+            NotificationArchive.created_at,
+            NotificationArchive.notificationID,
+            parse_limit(request.args.get('limit')),
+            request.args.get('cursor'),
+            descending=True
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return paginated_response([serialize_notification(notif) for notif in notifications], next_cursor)
+
+@api.route('/api/notifications/<id:user_id>/unread-count', methods=['GET'])
+def get_unread_notification_count(user_id):
+    unread = db.session.query(func.count(Notification.notificationID)).filter(
+        Notification.userID == user_id,
+        Notification.is_read.is_(False)
+    ).scalar()
+    return jsonify({'unread': unread})
+
+@api.route('/api/notifications/<id:user_id>/read', methods=['PUT'])
+@token_required
+def mark_notifications_read(current_user, user_id):
+    # Only the owner or an admin may mark a user's notifications as read
+    if current_user.userID != user_id and current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    query = Notification.query.filter(
+        Notification.userID == user_id,
+        Notification.is_read.is_(False)
+    )
+    # Mark only the given notifications, or all of them when none are listed
+    if data.get('notificationIDs'):
+        try:
+            notification_ids = [parse_id(notification_id) for notification_id in data['notificationIDs']]
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        query = query.filter(Notification.notificationID.in_(notification_ids))
+    updated = query.update({'is_read': True}, synchronize_session=False)
+    db.session.commit()
+    return jsonify({'message': f'{updated} notifications marked as read'})
+
+@api.route('/api/notifications/<id:user_id>/stream', methods=['GET'])
+def stream_user_notifications(user_id):
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        if since:
+            decode_cursor(since)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Without a cursor, only stream notifications created from now on
+    if not since:
+        latest = Notification.query.filter_by(userID=user_id).order_by(
+            Notification.created_at.desc(),
+            Notification.notificationID.desc()
+        ).first()
+        since = notification_cursor(latest) if latest else None
+    
+    def generate(since):
+        deadline = time.monotonic() + current_app.config['NOTIFICATION_STREAM_TIMEOUT']
+        yield 'retry: 2000\n\n'
+        while time.monotonic() < deadline:
+            notifications = newer_notifications(user_id, since).order_by(
+                Notification.created_at,
+                Notification.notificationID
+            ).limit(100).all()
+            db.session.rollback()
+            for notif in notifications:
+                since = notification_cursor(notif)
+                yield f'id: {since}\nevent: notification\ndata: {dumps_json(serialize_notification(notif)).decode()}\n\n'
+            if not notifications:
+                yield ': keep-alive\n\n'
+                time.sleep(current_app.config['NOTIFICATION_POLL_INTERVAL'])
+    
+    return current_app.response_class(
+        stream_with_context(generate(since)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Search. Ranked prefix matching for type-ahead across equipment, labs,
+# reservations and (for admins) users; students only see their own reservations.
+@api.route('/api/search', methods=['GET'])
+@token_required
+def search_records(current_user):
+    terms = search.search_terms(request.args.get('q', ''))
+    if not terms:
+        return jsonify({'error': 'Missing search query'}), 400
+    
+    is_admin = current_user.role == 'admin'
+    kinds = [kind for kind in search.SOURCES if is_admin or kind != 'user']
+    if request.args.get('type'):
+        requested = request.args['type'].split(',')
+        unknown = [kind for kind in requested if kind not in search.SOURCES]
+        if unknown:
+            return jsonify({'error': f'Unknown search type: {unknown[0]}'}), 400
+        if 'user' in requested and not is_admin:
+            return jsonify({'error': 'Unauthorized'}), 403
+        kinds = [kind for kind in kinds if kind in requested]
+    
+    try:
+        limit = parse_limit(request.args.get('limit'), current_app.config['SEARCH_PAGE_SIZE'], current_app.config['SEARCH_MAX_PAGE_SIZE'])
+        offset = decode_offset(request.args['cursor']) if request.args.get('cursor') else 0
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    dialect_name = db.engine.dialect.name
+    try:
+        rows = db.session.execute(search.search_statement(kinds, dialect_name, owner=not is_admin), {
+            'match': search.match_expression(terms, dialect_name),
+            'owner': current_user.userID,
+            'limit': limit + 1,
+            'offset': offset
+        }).fetchall()
+    except OperationalError:
+        db.session.rollback()
+        current_app.logger.exception('Search failed')
+        return jsonify({'error': 'Search index is not available; run flask rebuild-search'}), 503
+    
+    next_cursor = encode_offset(offset + limit) if len(rows) > limit else None
+    return paginated_response([dict(row._mapping) for row in rows[:limit]], next_cursor)
 
 # Equipment availability check
-@app.route('/api/equipment/<equipment_id>/availability', methods=['GET'])
+@api.route('/api/equipment/<id:equipment_id>/availability', methods=['GET'])
 def check_equipment_availability(equipment_id):
     start_time = request.args.get('start_time')
     end_time = request.args.get('end_time')
@@ -545,37 +2108,457 @@ def check_equipment_availability(equipment_id):
     start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
     end_dt = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
     
-    conflicting_reservations = Reservation.query.filter(
-        Reservation.equipmentID == equipment_id,
-        Reservation.status.in_(['confirmed', 'pending']),
-        Reservation.start_time < end_dt,
+    equipment = LabEquipment.query.get_or_404(equipment_id)
+    units_in_use = capacity_index.peak(equipment.equipmentID, start_dt, end_dt, equipment.capacity_version)
+    available_units = max(equipment.total_quantity - units_in_use, 0)
+    
+    return jsonify({
+        'available': available_units > 0,
+        'units_in_use': units_in_use,
+        'available_units': available_units
+    })
+
+# Lab-wide availability calendar: free units per equipment item per time slot
+@api.route('/api/laboratories/<id:lab_id>/availability', methods=['GET'])
+def get_laboratory_availability(lab_id):
+    try:
+        start_dt = parse_datetime_arg('start_time')
+        end_dt = parse_datetime_arg('end_time')
+        slot_minutes = int(request.args.get('slot_minutes', 60))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not start_dt or not end_dt:
+        return jsonify({'error': 'start_time and end_time parameters are required'}), 400
+    if end_dt <= start_dt:
+        return jsonify({'error': 'end_time must be after start_time'}), 400
+    if slot_minutes < 1:
+        return jsonify({'error': 'slot_minutes must be at least 1'}), 400
+    
+    slot_size = timedelta(minutes=slot_minutes)
+    slot_count = -(-(end_dt - start_dt) // slot_size)  # ceiling division
+    if slot_count > current_app.config['CALENDAR_MAX_SLOTS']:
+        return jsonify({'error': f'At most {current_app.config["CALENDAR_MAX_SLOTS"]} slots per request'}), 400
+    
+    lab = Laboratory.query.get_or_404(lab_id)
+    equipment = LabEquipment.query.filter_by(labID=lab.labID).order_by(LabEquipment.name).all()
+    
+    # Load every reservation overlapping the slots once and group it by item.
+    # The last slot may run past end_time, so load up to where it ends.
+    slots_end = start_dt + slot_count * slot_size
+    intervals = {eq.equipmentID: [] for eq in equipment}
+    reservations = db.session.query(
+        Reservation.equipmentID,
+        Reservation.start_time,
+        Reservation.end_time,
+        Reservation.quantity
+    ).filter(
+        Reservation.equipmentID.in_(list(intervals)),
+        Reservation.status.in_(ACTIVE_RESERVATION_STATUSES),
+        Reservation.start_time < slots_end,
         Reservation.end_time > start_dt
-    ).all()
+    )
+    for equipment_id, start, end, quantity in reservations:
+        intervals[equipment_id].append((start, end, quantity))
     
+    slot_seconds = slot_minutes * 60
     return jsonify({
-        'available': len(conflicting_reservations) == 0,
-        'conflicting_reservations': len(conflicting_reservations)
+        'labID': lab.labID,
+        'lab_name': lab.lab_name,
+        'slot_minutes': slot_minutes,
+        'slots': [(start_dt + i * slot_size).isoformat() for i in range(slot_count)],
+        'equipment': [{
+            'equipmentID': eq.equipmentID,
+            'name': eq.name,
+            'status': eq.status,
+            'total_quantity': eq.total_quantity,
+            'free': [
+                max(eq.total_quantity - peak, 0)
+                for peak in slot_peaks(intervals[eq.equipmentID], start_dt, slot_seconds, slot_count)
+            ]
+        } for eq in equipment]
     })
 
-# Initialize database function
-def init_db():
-    with app.app_context():
-        # Drop all tables first to ensure clean state
-        db.drop_all()
-        db.create_all()
-        
-        # Create initial laboratories
-        labs = [
-            Laboratory(lab_name='Computer Science Lab'),
-            Laboratory(lab_name='Electronics Lab'),
-            Laboratory(lab_name='Robotics Lab'),
-            Laboratory(lab_name='Networking Lab')
-        ]
-        
-        db.session.add_all(labs)
+# Utilization reports, read from the daily rollup so their cost depends on
+# the number of days covered rather than the number of reservations
+def parse_report_range():
+    try:
+        end_day = date.fromisoformat(request.args['end_date']) if request.args.get('end_date') else datetime.utcnow().date()
+        start_day = date.fromisoformat(request.args['start_date']) if request.args.get('start_date') else end_day - timedelta(days=29)
+    except ValueError as e:
+        raise ValueError(f'Invalid date format: {str(e)}')
+    if start_day > end_day:
+        raise ValueError('start_date must not be after end_date')
+    if (end_day - start_day).days >= current_app.config['REPORT_MAX_DAYS']:
+        raise ValueError(f'Reports can cover at most {current_app.config["REPORT_MAX_DAYS"]} days')
+    return start_day, end_day
+
+def utilization_query(start_day, end_day, *columns):
+    query = db.session.query(*columns, *[
+        func.coalesce(func.sum(getattr(UtilizationDaily, counter)), 0).label(counter)
+        for counter in utilization.COUNTERS
+    ]).filter(
+        UtilizationDaily.day >= start_day,
+        UtilizationDaily.day <= end_day
+    )
+    lab_id = parse_id_arg('labID')
+    if lab_id:
+        query = query.filter(UtilizationDaily.labID == lab_id)
+    equipment_id = parse_id_arg('equipmentID')
+    if equipment_id:
+        query = query.filter(UtilizationDaily.equipmentID == equipment_id)
+    return query
+
+def serialize_utilization(row):
+    decided = row.approved + row.rejected
+    closed = row.returned + row.completed
+    return {
+        'unit_hours': round(row.unit_hours, 2),
+        'approved': row.approved,
+        'rejected': row.rejected,
+        'returned': row.returned,
+        'completed': row.completed,
+        'late_returns': row.late_returns,
+        'approval_rate': round(row.approved / decided, 4) if decided else None,
+        'rejection_rate': round(row.rejected / decided, 4) if decided else None,
+        'late_return_rate': round(row.late_returns / closed, 4) if closed else None
+    }
+
+@api.route('/api/reports/utilization', methods=['GET'])
+@token_required
+def get_utilization_report(current_user):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    group_by = request.args.get('group_by', 'day')
+    group_columns = {
+        'day': UtilizationDaily.day,
+        'equipment': UtilizationDaily.equipmentID,
+        'lab': UtilizationDaily.labID
+    }
+    if group_by not in group_columns:
+        return jsonify({'error': 'group_by must be one of day, equipment, lab'}), 400
+    key = group_columns[group_by]
+    try:
+        start_day, end_day = parse_report_range()
+        rows = utilization_query(start_day, end_day, key.label('key')).group_by(key).order_by(key).all()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    names = {}
+    if group_by == 'equipment':
+        names = dict(db.session.query(LabEquipment.equipmentID, LabEquipment.name).filter(
+            LabEquipment.equipmentID.in_([row.key for row in rows])
+        ).all())
+    elif group_by == 'lab':
+        names = dict(db.session.query(Laboratory.labID, Laboratory.lab_name).filter(
+            Laboratory.labID.in_([row.key for row in rows if row.key])
+        ).all())
+    
+    items = []
+    for row in rows:
+        item = serialize_utilization(row)
+        if group_by == 'day':
+            item['day'] = row.key.isoformat()
+        elif group_by == 'equipment':
+            item['equipmentID'] = row.key
+            item['equipment_name'] = names.get(row.key, 'Unknown Equipment')
+        else:
+            item['labID'] = row.key
+            item['laboratory_name'] = names.get(row.key)
+        items.append(item)
+    
+    return jsonify({
+        'start_date': start_day.isoformat(),
+        'end_date': end_day.isoformat(),
+        'group_by': group_by,
+        'items': items
+    })
+
+@api.route('/api/reports/summary', methods=['GET'])
+@token_required
+def get_utilization_summary(current_user):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    try:
+        start_day, end_day = parse_report_range()
+        totals = serialize_utilization(utilization_query(start_day, end_day).one())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Reservations still out past their end time, read live from the (status, end_time) index
+    overdue = db.session.query(func.count(Reservation.reservationID)).filter(
+        Reservation.status.in_(('approved', 'overdue')),
+        Reservation.end_time < datetime.utcnow()
+    )
+    lab_id = parse_id_arg('labID')
+    if lab_id:
+        overdue = overdue.filter(Reservation.equipmentID.in_(
+            db.session.query(LabEquipment.equipmentID).filter(LabEquipment.labID == lab_id)
+        ))
+    equipment_id = parse_id_arg('equipmentID')
+    if equipment_id:
+        overdue = overdue.filter(Reservation.equipmentID == equipment_id)
+    totals['currently_overdue'] = overdue.scalar()
+    
+    return jsonify(dict(totals, start_date=start_day.isoformat(), end_date=end_day.isoformat()))
+
+# Notification worker
+@api.cli.command('drain-notifications')
+@click.option('--batch-size', default=200, help='Events processed per transaction.')
+@click.option('--loop', is_flag=True, help='Keep polling the outbox instead of exiting when it is empty.')
+@click.option('--interval', default=2.0, help='Seconds to sleep between polls when idle.')
+def drain_notifications_command(batch_size, loop, interval):
+    backends = build_backends(current_app.config)
+    while True:
+        rendered, delivered = drain_notification_outbox(batch_size, backends)
+        if rendered or delivered:
+            click.echo(f'Rendered {rendered}, delivered {delivered} notifications')
+            continue
+        if not loop:
+            break
+        time.sleep(interval)
+
+# Overdue sweeper
+@api.cli.command('sweep-overdue')
+@click.option('--policy', type=click.Choice(list(OVERDUE_POLICIES)), default=None,
+              help='Mark reservations overdue or complete them; defaults to OVERDUE_POLICY.')
+@click.option('--grace-minutes', type=int, default=None,
+              help='Minutes past the end time before a reservation is swept; defaults to OVERDUE_GRACE_MINUTES.')
+@click.option('--batch-size', default=500, help='Reservations closed per transaction.')
+@click.option('--loop', is_flag=True, help='Keep sweeping instead of exiting when nothing is overdue.')
+@click.option('--interval', default=60.0, help='Seconds to sleep between sweeps when idle.')
+def sweep_overdue_command(policy, grace_minutes, batch_size, loop, interval):
+    """Release the units held by approved reservations that ran past their end time."""
+    policy = policy or current_app.config['OVERDUE_POLICY']
+    if policy not in OVERDUE_POLICIES:
+        raise click.BadParameter(f'OVERDUE_POLICY must be one of {", ".join(OVERDUE_POLICIES)}')
+    if grace_minutes is None:
+        grace_minutes = current_app.config['OVERDUE_GRACE_MINUTES']
+    while True:
+        swept = sweep_overdue_reservations(
+            datetime.utcnow() - timedelta(minutes=grace_minutes), policy, batch_size
+        )
+        if swept:
+            click.echo(f'Swept {swept} overdue reservations')
+            continue
+        if not loop:
+            break
+        time.sleep(interval)
+
+# Archival and compaction
+@api.cli.command('compact')
+@click.option('--reservation-days', default=180, help='Archive closed reservations that ended more than this many days ago.')
+@click.option('--notification-days', default=90, help='Archive read notifications older than this many days.')
+@click.option('--batch-size', default=1000, help='Rows moved per transaction.')
+@click.option('--max-batches', default=0, help='Stop after this many batches per table (0 for no limit).')
+def compact_command(reservation_days, notification_days, batch_size, max_batches):
+    now = datetime.utcnow()
+    jobs = [
+        ('closed reservations', archive_closed_reservations, now - timedelta(days=reservation_days)),
+        ('read notifications', archive_read_notifications, now - timedelta(days=notification_days)),
+        ('delivered outbox events', purge_delivered_events, now - timedelta(days=notification_days)),
+    ]
+    for label, job, cutoff in jobs:
+        total = batches = 0
+        while not max_batches or batches < max_batches:
+            moved = job(cutoff, batch_size)
+            if not moved:
+                break
+            total += moved
+            batches += 1
+        click.echo(f'Compacted {total} {label}')
+
+# Utilization rollup backfill
+@api.cli.command('rebuild-utilization')
+@click.option('--start', 'start_date', default=None, help='First day to rebuild (YYYY-MM-DD); defaults to all history.')
+@click.option('--end', 'end_date', default=None, help='Last day to rebuild (YYYY-MM-DD); defaults to all history.')
+@click.option('--batch-size', default=1000, help='Rows read and written per batch.')
+def rebuild_utilization_command(start_date, end_date, batch_size):
+    """Recompute the daily utilization rollup from live and archived reservations."""
+    try:
+        start_day = date.fromisoformat(start_date) if start_date else None
+        end_day = date.fromisoformat(end_date) if end_date else None
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    rows = rebuild_utilization(start_day, end_day, batch_size)
+    click.echo(f'Rebuilt {rows} utilization rows')
+
+# Bulk inventory import
+@api.cli.command('import-equipment')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(list(transfer.FORMATS)), default=None,
+              help='Input format; guessed from the file extension when omitted.')
+@click.option('--batch-size', default=1000, help='Rows inserted per transaction.')
+def import_equipment_command(path, fmt, batch_size):
+    """Import equipment from a CSV (name, labID or lab_name, total_quantity, status) or NDJSON file."""
+    with open(path, 'rb') as f:
+        imported, failed, errors = import_equipment(
+            codecs.iterdecode(f, 'utf-8-sig'),
+            fmt or transfer.detect_format(filename=path),
+            batch_size
+        )
+    for error in errors:
+        click.echo(f'Line {error["line"]}: {error["error"]}', err=True)
+    click.echo(f'Imported {imported} equipment items, {failed} failed')
+
+# Search index maintenance
+@api.cli.command('rebuild-search')
+def rebuild_search_command():
+    """Create missing search indexes and repopulate them from the tables."""
+    with db.engine.begin() as connection:
+        search.rebuild_search_index(connection)
+    click.echo('Search index rebuilt')
+
+# Key storage migration
+@api.cli.command('compact-keys')
+@click.option('--batch-size', default=1000, help='Rows rewritten per transaction.')
+def compact_keys_command(batch_size):
+    """Rewrite text UUID keys left by older versions as 16-byte values (SQLite)."""
+    if current_app.config['COMPACT_KEYS']:
+        raise click.ClickException('Run compact-keys without COMPACT_KEYS=1, and set it once the keys are converted')
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException(
+            'Only SQLite databases are converted in place; on PostgreSQL run '
+            'ALTER TABLE ... ALTER COLUMN ... TYPE uuid USING <column>::uuid for each key column'
+        )
+    
+    invalid = 0
+    for table in db.metadata.sorted_tables:
+        for column in table.columns:
+            if not isinstance(column.type, KeyType):
+                continue
+            total = 0
+            last_row_id = 0
+            while True:
+                rows = db.session.execute(
+                    db.text(
+                        f'SELECT rowid, "{column.name}" FROM "{table.name}" '
+                        f'WHERE typeof("{column.name}") = \'text\' AND rowid > :after ORDER BY rowid LIMIT :limit'
+                    ),
+                    {'after': last_row_id, 'limit': batch_size}
+                ).fetchall()
+                if not rows:
+                    break
+                last_row_id = rows[-1][0]
+                updates = []
+                for row_id, value in rows:
+                    try:
+                        updates.append({'value': key_bytes(value), 'row_id': row_id})
+                    except ValueError:
+                        # Leave the row as it is and report it rather than guess a key
+                        invalid += 1
+                        click.echo(f'{table.name}.{column.name} rowid {row_id}: invalid key {value!r}', err=True)
+                if updates:
+                    db.session.execute(
+                        db.text(f'UPDATE "{table.name}" SET "{column.name}" = :value WHERE rowid = :row_id'),
+                        updates
+                    )
+                db.session.commit()
+                total += len(updates)
+            if total:
+                click.echo(f'Converted {total} keys in {table.name}.{column.name}')
+    if invalid:
+        raise click.ClickException(
+            f'{invalid} keys are not valid UUIDs and were left as text; fix or delete those rows and run again'
+        )
+    click.echo('Keys are stored compactly; set COMPACT_KEYS=1 from now on')
+
+# Application factory
+def create_app(config=None):
+    """Create and configure an app; ``config`` overrides the defaults and environment settings."""
+    config = config or {}
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    configure_storage(app, config.get('SQLALCHEMY_DATABASE_URI'))
+    app.config.update(config)
+    if app.config['PROXY_FIX_X_FOR']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+    
+    cors.init_app(app, resources={
+        r"/api/*": {
+            "origins": ["http://localhost:3000"],
+            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization"],
+            "expose_headers": ["X-Next-Cursor", "X-Latest-Cursor", "ETag"]
+        }
+    })
+    db.init_app(app)
+    configure_keys(db.get_engine(app), db.metadata, app.config['COMPACT_KEYS'])
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR, render_as_batch=True, include_object=search.include_object)
+    metrics.init_app(app)
+    app.extensions['principal_cache'] = TTLCache(
+        maxsize=app.config['PRINCIPAL_CACHE_SIZE'],
+        ttl=app.config['PRINCIPAL_CACHE_TTL']
+    )
+    app.extensions['response_cache'] = build_response_cache(app.config)
+    app.extensions['json_encoder'] = build_json_encoder(app.config['JSON_ENCODER'])
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        salt_length=app.config['PASSWORD_SALT_LENGTH'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT']
+    )
+    app.extensions['login_account_throttle'] = LoginThrottle(app.config['LOGIN_ACCOUNT_LIMIT'])
+    app.extensions['login_ip_throttle'] = LoginThrottle(app.config['LOGIN_IP_LIMIT'])
+    app.url_map.converters['id'] = IDConverter
+    app.register_blueprint(api)
+    return app
+
+# Schema and reference data. Safe to run on every start: against an
+# up-to-date database it only checks the schema version.
+DEFAULT_LABORATORIES = ['Computer Science Lab', 'Electronics Lab', 'Robotics Lab', 'Networking Lab']
+
+def seed_db():
+    """Add any missing default laboratories; returns how many were created."""
+    existing = {name for name, in db.session.query(Laboratory.lab_name)}
+    missing = [Laboratory(lab_name=name) for name in DEFAULT_LABORATORIES if name not in existing]
+    if missing:
+        db.session.add_all(missing)
+        bump_catalog_version()
         db.session.commit()
+    return len(missing)
+
+# Schema that create_all produced before migrations were introduced
+BASELINE_REVISION = 'a3e5c1d27f90'
+BASELINE_SCHEMA = {
+    'user': {'userID', 'name', 'email', 'password', 'role'},
+    'laboratory': {'labID', 'lab_name'},
+    'lab_equipment': {'equipmentID', 'labID', 'name', 'status', 'total_quantity', 'available_quantity'},
+    'reservation': {'reservationID', 'userID', 'equipmentID', 'start_time', 'end_time', 'status', 'quantity',
+                    'reason', 'admin_notes', 'return_timestamp'},
+    'notification': {'notificationID', 'userID', 'reservationID', 'message', 'is_read', 'created_at'},
+}
+
+def init_db():
+    inspector = inspect(db.engine)
+    tables = inspector.get_table_names()
+    if tables and 'alembic_version' not in tables:
+        # Created by create_all before migrations existed: adopt it at the
+        # baseline revision, then migrate it forward like any other database
+        schema = {table: {column['name'] for column in inspector.get_columns(table)} for table in tables}
+        if schema != BASELINE_SCHEMA:
+            raise RuntimeError(
+                'The database has no migration history and does not match the baseline schema; '
+                'see "Adopting an unversioned database" in the README'
+            )
+        stamp(revision=BASELINE_REVISION)
+    upgrade()
+    seed_db()
+
+@api.cli.command('init-db')
+def init_db_command():
+    """Apply pending migrations and seed the default laboratories."""
+    try:
+        init_db()
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    click.echo('Database is up to date')
 
-# Run the initialization
 if __name__ == '__main__':
-    init_db()
-    app.run(debug=True)
\ No newline at end of file
+    app = create_app()
+    with app.app_context():
+        init_db()
+    app.run(debug=True)
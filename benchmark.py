@@ -0,0 +1,305 @@
+"""Offline load test for the hot API endpoints.
+
+Seeds a synthetic dataset into a throwaway SQLite database using the app's
+own models, drives each endpoint through the Flask test client and writes
+throughput, latency percentiles and SQL statement counts to a JSON file so
+runs can be compared across commits::
+
+    python benchmark.py --labs 4 --equipment 40 --reservations 20000 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import jwt
+from werkzeug.security import generate_password_hash
+
+import app as lab_app
+from keys import new_id
+from querycount import QueryCounter
+
+CLOSED_STATUSES = ['completed', 'returned', 'rejected']
+
+
+def seed_dataset(args, rng):
+    """Insert labs, equipment, users, reservations and notifications in bulk."""
+    db = lab_app.db
+    password = generate_password_hash('benchmark')
+    semester_start = datetime(2026, 1, 5, 8, 0)
+
+    labs = [{'labID': new_id(), 'lab_name': f'Lab {i}'} for i in range(args.labs)]
+    equipment = [{
+        'equipmentID': new_id(),
+        'labID': labs[i % args.labs]['labID'],
+        'name': f'Equipment {i}',
+        'status': 'available',
+        'total_quantity': rng.randint(2, 10),
+        'available_quantity': 0
+    } for i in range(args.equipment)]
+    for eq in equipment:
+        eq['available_quantity'] = eq['total_quantity']
+
+    users = [{
+        'userID': new_id(),
+        'name': f'Student {i}',
+        'email': f'student{i}@example.edu',
+        'password': password,
+        'role': 'student'
+    } for i in range(args.users)]
+    admin = {
+        'userID': new_id(),
+        'name': 'Admin',
+        'email': 'admin@example.edu',
+        'password': password,
+        'role': 'admin'
+    }
+
+    reservations = []
+    notifications = []
+    for i in range(args.reservations):
+        eq = rng.choice(equipment)
+        user = rng.choice(users)
+        # Lab sessions cluster in working hours across the semester
+        day = rng.randint(0, args.days - 1)
+        start = semester_start + timedelta(days=day, hours=rng.randint(0, 9), minutes=rng.choice([0, 30]))
+        end = start + timedelta(hours=rng.randint(1, 4))
+        # Old bookings are closed; recent ones are still pending or approved
+        if day < args.days * 0.8:
+            status = rng.choice(CLOSED_STATUSES)
+        else:
+            status = rng.choice(['pending', 'approved'])
+        quantity = rng.randint(1, min(2, eq['total_quantity']))
+        reservation_id = new_id()
+        reservations.append({
+            'reservationID': reservation_id,
+            'userID': user['userID'],
+            'equipmentID': eq['equipmentID'],
+            'start_time': start,
+            'end_time': end,
+            'status': status,
+            'quantity': quantity,
+            'reason': 'Benchmark lab session',
+            'admin_notes': '',
+            'return_timestamp': end if status in ('completed', 'returned') else None
+        })
+        notifications.append({
+            'notificationID': new_id(),
+            'userID': user['userID'],
+            'reservationID': reservation_id,
+            'message': f'Your reservation for {quantity} {eq["name"]}(s) has been created and is pending approval.',
+            'is_read': True,
+            'created_at': start - timedelta(days=7)
+        })
+        if status != 'pending':
+            notifications.append({
+                'notificationID': new_id(),
+                'userID': user['userID'],
+                'reservationID': reservation_id,
+                'message': f'Your reservation for {quantity} {eq["name"]}(s) has been {status}.',
+                'is_read': rng.random() < 0.7,
+                'created_at': start - timedelta(days=rng.randint(1, 6))
+            })
+
+    for model, rows in [
+        (lab_app.Laboratory, labs),
+        (lab_app.LabEquipment, equipment),
+        (lab_app.User, users + [admin]),
+        (lab_app.Reservation, reservations),
+        (lab_app.Notification, notifications),
+    ]:
+        for offset in range(0, len(rows), 5000):
+            db.session.bulk_insert_mappings(model, rows[offset:offset + 5000])
+    db.session.commit()
+    lab_app.rebuild_utilization()
+
+    return {
+        'labs': labs,
+        'equipment': equipment,
+        'users': users,
+        'admin': admin,
+        'semester_start': semester_start,
+        'counts': {
+            'labs': len(labs),
+            'equipment': len(equipment),
+            'users': len(users) + 1,
+            'reservations': len(reservations),
+            'notifications': len(notifications)
+        }
+    }
+
+
+def build_scenarios(app, data, args, rng):
+    """Return ``(name, request_count, make_request)`` for each endpoint under test."""
+    token = jwt.encode({
+        'userID': data['admin']['userID'],
+        'email': data['admin']['email'],
+        'role': 'admin',
+        'exp': datetime.utcnow() + timedelta(days=1)
+    }, app.config['SECRET_KEY'])
+    admin_headers = {'Authorization': f'Bearer {token}'}
+    window_start = data['semester_start'] + timedelta(days=int(args.days * 0.8))
+
+    def random_window(hours=2):
+        start = window_start + timedelta(days=rng.randint(0, max(int(args.days * 0.2) - 1, 0)), hours=rng.randint(0, 9))
+        return start, start + timedelta(hours=hours)
+
+    def get(path, **kwargs):
+        return lambda client: client.get(path(), **kwargs)
+
+    def create_reservation(client):
+        start, end = random_window()
+        return client.post('/api/reservations', json={
+            'userID': rng.choice(data['users'])['userID'],
+            'equipmentID': rng.choice(data['equipment'])['equipmentID'],
+            'start_time': start.isoformat(),
+            'end_time': end.isoformat(),
+            'reason': 'Benchmark booking',
+            'quantity': 1
+        })
+
+    def equipment_availability():
+        start, end = random_window()
+        eq = rng.choice(data['equipment'])['equipmentID']
+        return f'/api/equipment/{eq}/availability?start_time={start.isoformat()}&end_time={end.isoformat()}'
+
+    def lab_calendar():
+        start, _ = random_window()
+        lab = rng.choice(data['labs'])['labID']
+        end = start + timedelta(days=7)
+        return f'/api/laboratories/{lab}/availability?start_time={start.isoformat()}&end_time={end.isoformat()}&slot_minutes=60'
+
+    def utilization_report():
+        start = data['semester_start'].date()
+        end = start + timedelta(days=args.days - 1)
+        return f'/api/reports/utilization?group_by=equipment&start_date={start.isoformat()}&end_date={end.isoformat()}'
+
+    def login(client):
+        return client.post('/api/login', json={
+            'email': rng.choice(data['users'])['email'],
+            'password': 'benchmark'
+        })
+
+    n = args.requests
+    return [
+        ('GET /api/equipment', n, get(lambda: '/api/equipment')),
+        ('GET /api/laboratories', n, get(lambda: '/api/laboratories')),
+        ('GET /api/reservations', n, get(lambda: '/api/reservations', headers=admin_headers)),
+        ('GET /api/users/<id>/reservations', n,
+         get(lambda: f'/api/users/{rng.choice(data["users"])["userID"]}/reservations')),
+        ('GET /api/notifications/<id>', n,
+         get(lambda: f'/api/notifications/{rng.choice(data["users"])["userID"]}')),
+        ('GET /api/equipment/<id>/availability', n, get(equipment_availability)),
+        ('GET /api/laboratories/<id>/availability', n, get(lab_calendar)),
+        ('GET /api/reports/utilization', n, get(utilization_report, headers=admin_headers)),
+        ('GET /api/search', n, get(lambda: f'/api/search?q=equipment {rng.randint(1, args.equipment)}', headers=admin_headers)),
+        ('POST /api/reservations', n, create_reservation),
+        ('POST /api/login', max(args.requests // 20, 1), login),
+    ]
+
+
+def percentile(sorted_values, fraction):
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_scenario(client, engine, count, make_request):
+    # One untimed request warms per-process caches and the SQLite page cache
+    make_request(client)
+    latencies = []
+    statements = 0
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(count):
+        with QueryCounter(engine) as counter:
+            request_started = time.perf_counter()
+            response = make_request(client)
+            latencies.append(time.perf_counter() - request_started)
+        statements += counter.count
+        if response.status_code >= 500:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': count,
+        'errors': errors,
+        'throughput_rps': round(count / elapsed, 2),
+        'mean_ms': round(sum(latencies) / count * 1000, 3),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'sql_statements_per_request': round(statements / count, 2)
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--labs', type=int, default=4)
+    parser.add_argument('--equipment', type=int, default=40)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--reservations', type=int, default=20000)
+    parser.add_argument('--days', type=int, default=120, help='Length of the simulated semester.')
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per endpoint.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix='lab-benchmark-')
+    app = lab_app.create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, "benchmark.db")}',
+        'RESPONSE_CACHE_BACKEND': 'memory',
+        # Every simulated login comes from the same address
+        'LOGIN_ACCOUNT_LIMIT': 0,
+        'LOGIN_IP_LIMIT': 0
+    })
+
+    results = {}
+    with app.app_context():
+        lab_app.db.create_all()
+        seed_started = time.perf_counter()
+        data = seed_dataset(args, rng)
+        print(f'Seeded {data["counts"]} in {time.perf_counter() - seed_started:.1f}s')
+
+        client = app.test_client()
+        for name, count, make_request in build_scenarios(app, data, args, rng):
+            results[name] = run_scenario(client, lab_app.db.engine, count, make_request)
+            r = results[name]
+            print(f'{name:45} {r["throughput_rps"]:>9.1f} req/s  p50 {r["p50_ms"]:>8.2f} ms  '
+                  f'p95 {r["p95_ms"]:>8.2f} ms  p99 {r["p99_ms"]:>8.2f} ms  sql {r["sql_statements_per_request"]:>6.1f}')
+
+    report = {
+        'meta': {
+            'commit': current_commit(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'database': 'sqlite',
+            'parameters': vars(args),
+            'dataset': data['counts']
+        },
+        'endpoints': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
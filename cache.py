@@ -0,0 +1,116 @@
+"""Caches shared by the API: in-process LRU entries and versioned response bodies."""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return default if entry is None else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class MemoryBackend:
+    """Per-process LRU store for serialized responses."""
+
+    def __init__(self, maxsize=64):
+        self._cache = TTLCache(maxsize=maxsize, ttl=float('inf'))
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value)
+
+
+class DirectoryBackend:
+    """Stores each entry as a file under ``path`` so every worker on the host shares it."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def get(self, key):
+        try:
+            with open(os.path.join(self.path, key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, value):
+        fd, tmp_path = tempfile.mkstemp(dir=self.path)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(value)
+        os.replace(tmp_path, os.path.join(self.path, key))
+
+
+class VersionedCache:
+    """Serialized response bodies tagged with the data version they were built from.
+
+    Each name holds a single entry; a lookup with any other version is a miss,
+    so bumping the version invalidates every worker's copy at once.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get(self, name, version):
+        """Return ``(etag, body)`` if ``name`` was cached at ``version``."""
+        raw = self.backend.get(name)
+        if raw is None:
+            return None
+        header, _, body = raw.partition(b'\n')
+        cached_version, etag = header.decode().split(' ', 1)
+        if int(cached_version) != version:
+            return None
+        return etag, body
+
+    def set(self, name, version, body):
+        etag = hashlib.sha1(body).hexdigest()
+        self.backend.set(name, f'{version} {etag}\n'.encode() + body)
+        return etag, body
+
+
+def build_response_cache(config):
+    """Create the response cache selected by ``RESPONSE_CACHE_BACKEND``."""
+    if config.get('RESPONSE_CACHE_BACKEND') == 'directory':
+        return VersionedCache(DirectoryBackend(config['RESPONSE_CACHE_DIR']))
+    return VersionedCache(MemoryBackend())
@@ -0,0 +1,179 @@
+"""Per-equipment capacity timelines for reservation conflict checks.
+
+Each timeline is a sparse segment tree over whole seconds since the epoch.
+Adding a reservation is a range add of its quantity over ``[start, end)``
+and the conflict check is a range max, so both run in ``O(log T)`` where
+``T`` is the size of the time domain, independent of how many bookings an
+item has accumulated.
+"""
+import math
+import threading
+from datetime import datetime, timezone
+
+EPOCH = datetime(1970, 1, 1)
+# 2**40 seconds covers roughly 34,000 years past the epoch
+DOMAIN_SIZE = 1 << 40
+
+# Node layout: [peak, pending_add, left, right]
+_PEAK, _ADD, _LEFT, _RIGHT = range(4)
+
+
+def to_seconds(value, round_up=False):
+    """Convert a datetime to whole seconds since the epoch (naive UTC)."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    seconds = (value - EPOCH).total_seconds()
+    seconds = math.ceil(seconds) if round_up else math.floor(seconds)
+    return min(max(seconds, 0), DOMAIN_SIZE)
+
+
+def _new_node():
+    return [0, 0, None, None]
+
+
+class CapacityTimeline:
+    """Units in use over time for a single equipment item."""
+
+    def __init__(self):
+        self._root = _new_node()
+
+    def add(self, start, end, quantity):
+        lo, hi = to_seconds(start), to_seconds(end, round_up=True)
+        if lo < hi and quantity:
+            self._update(self._root, 0, DOMAIN_SIZE, lo, hi, quantity)
+
+    def remove(self, start, end, quantity):
+        self.add(start, end, -quantity)
+
+    def peak(self, start, end):
+        """Return the maximum number of units in use during ``[start, end)``."""
+        lo, hi = to_seconds(start), to_seconds(end, round_up=True)
+        if lo >= hi:
+            return 0
+        return self._query(self._root, 0, DOMAIN_SIZE, lo, hi)
+
+    def _update(self, node, node_lo, node_hi, lo, hi, delta):
+        if lo <= node_lo and node_hi <= hi:
+            node[_ADD] += delta
+            node[_PEAK] += delta
+            return
+        mid = (node_lo + node_hi) // 2
+        if lo < mid:
+            if node[_LEFT] is None:
+                node[_LEFT] = _new_node()
+            self._update(node[_LEFT], node_lo, mid, lo, hi, delta)
+        if hi > mid:
+            if node[_RIGHT] is None:
+                node[_RIGHT] = _new_node()
+            self._update(node[_RIGHT], mid, node_hi, lo, hi, delta)
+        left = node[_LEFT][_PEAK] if node[_LEFT] is not None else 0
+        right = node[_RIGHT][_PEAK] if node[_RIGHT] is not None else 0
+        node[_PEAK] = max(left, right) + node[_ADD]
+
+    def _query(self, node, node_lo, node_hi, lo, hi):
+        if node is None:
+            return 0
+        if lo <= node_lo and node_hi <= hi:
+            return node[_PEAK]
+        mid = (node_lo + node_hi) // 2
+        best = 0
+        if lo < mid:
+            best = self._query(node[_LEFT], node_lo, mid, lo, hi)
+        if hi > mid:
+            best = max(best, self._query(node[_RIGHT], mid, node_hi, lo, hi))
+        return best + node[_ADD]
+
+
+class CapacityIndex:
+    """Lazily loaded capacity timelines keyed by equipment ID, for read-only views.
+
+    ``loader(equipment_id)`` must return ``(start_time, end_time, quantity)``
+    tuples for every reservation that currently holds capacity. Each timeline
+    remembers the version it was loaded at and is reloaded when asked for
+    any other one, so writers in any process invalidate it by bumping the
+    item's version in the database. Write paths must not rely on it for
+    conflict checks.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._timelines = {}
+        self._lock = threading.RLock()
+
+    def timeline(self, equipment_id, version):
+        with self._lock:
+            entry = self._timelines.get(equipment_id)
+            if entry is None or entry[0] != version:
+                timeline = CapacityTimeline()
+                for start, end, quantity in self._loader(equipment_id):
+                    timeline.add(start, end, quantity)
+                entry = self._timelines[equipment_id] = (version, timeline)
+            return entry[1]
+
+    def peak(self, equipment_id, start, end, version):
+        with self._lock:
+            return self.timeline(equipment_id, version).peak(start, end)
+
+    def invalidate(self, equipment_id=None):
+        with self._lock:
+            if equipment_id is None:
+                self._timelines.clear()
+            else:
+                self._timelines.pop(equipment_id, None)
+
+
+def allocate(requests, timeline, capacity, available):
+    """Admit ``requests`` greedily in the order given; returns ``(admitted, overflow)``.
+
+    ``requests`` holds ``(key, start_time, end_time, quantity)`` tuples and
+    ``timeline`` the units already committed. A request is admitted when it
+    keeps usage within ``capacity`` over its whole interval and no more than
+    ``available`` units are handed out in total. Admitted requests are added
+    to ``timeline``, so each decision sees the ones made before it.
+    """
+    admitted = []
+    overflow = []
+    for key, start, end, quantity in requests:
+        if quantity <= available and timeline.peak(start, end) + quantity <= capacity:
+            timeline.add(start, end, quantity)
+            available -= quantity
+            admitted.append(key)
+        else:
+            overflow.append(key)
+    return admitted, overflow
+
+
+def slot_peaks(intervals, start, slot_seconds, slot_count):
+    """Peak units in use in each of ``slot_count`` consecutive slots from ``start``.
+
+    ``intervals`` holds ``(start_time, end_time, quantity)`` tuples. All slots
+    are filled by one sweep over the sorted start/end events, so the cost is
+    ``O(R log R + S)`` for ``R`` reservations and ``S`` slots.
+    """
+    events = []
+    for interval_start, interval_end, quantity in intervals:
+        lo, hi = to_seconds(interval_start), to_seconds(interval_end, round_up=True)
+        if lo < hi:
+            events.append((lo, quantity))
+            events.append((hi, -quantity))
+    # Releases sort before takes at the same instant because intervals are half-open
+    events.sort()
+
+    origin = to_seconds(start)
+    usage = 0
+    i = 0
+    peaks = []
+    for slot in range(slot_count):
+        slot_start = origin + slot * slot_seconds
+        slot_end = slot_start + slot_seconds
+        # Settle everything up to the slot boundary before measuring inside it
+        while i < len(events) and events[i][0] <= slot_start:
+            usage += events[i][1]
+            i += 1
+        peak = usage
+        while i < len(events) and events[i][0] < slot_end:
+            usage += events[i][1]
+            peak = max(peak, usage)
+            i += 1
+        peaks.append(peak)
+    return peaks
@@ -0,0 +1,73 @@
+"""Pluggable delivery backends for notifications drained from the outbox.
+
+A backend receives a batch of rendered notifications as dicts with
+``notificationID``, ``userID``, ``email``, ``message`` and ``created_at``
+keys. It yields ``(notification, error)`` for each one as it is handled,
+with ``error`` set to ``None`` on success. Raising means every notification
+not yet yielded failed. The outbox worker records which backends accepted
+each notification and retries only the rest on a later run.
+"""
+import json
+import smtplib
+from email.message import EmailMessage
+
+
+class FileBackend:
+    """Append each notification as a JSON line to a local file."""
+
+    name = 'file'
+
+    def __init__(self, path):
+        self.path = path
+
+    def deliver(self, notifications):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for notification in notifications:
+                f.write(json.dumps(notification, default=str) + '\n')
+                f.flush()
+                yield notification, None
+
+
+class SMTPBackend:
+    """Send each notification as a plain-text email over one SMTP connection."""
+
+    name = 'smtp'
+
+    def __init__(self, host='localhost', port=25, sender='noreply@localhost', subject='Lab reservation update'):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.subject = subject
+
+    def deliver(self, notifications):
+        with smtplib.SMTP(self.host, self.port) as smtp:
+            for notification in notifications:
+                if not notification.get('email'):
+                    yield notification, None
+                    continue
+                message = EmailMessage()
+                message['From'] = self.sender
+                message['To'] = notification['email']
+                message['Subject'] = self.subject
+                message.set_content(notification['message'])
+                try:
+                    smtp.send_message(message)
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+                    # Refused by the server for this message only; the connection is still usable
+                    yield notification, str(e)
+                    continue
+                yield notification, None
+
+
+def build_backends(config):
+    """Create the backends enabled in the Flask ``config``."""
+    backends = []
+    if config.get('NOTIFICATION_LOG_PATH'):
+        backends.append(FileBackend(config['NOTIFICATION_LOG_PATH']))
+    if config.get('NOTIFICATION_SMTP_HOST'):
+        backends.append(SMTPBackend(
+            host=config['NOTIFICATION_SMTP_HOST'],
+            port=config.get('NOTIFICATION_SMTP_PORT', 25),
+            sender=config.get('NOTIFICATION_SENDER', 'noreply@localhost')
+        ))
+    return backends
@@ -0,0 +1,146 @@
+"""Primary key generation and storage.
+
+Keys are time-ordered UUIDs (UUIDv7 layout), so new rows append to the end
+of each B-tree index instead of landing on random pages. They are stored as
+16 raw bytes, or the native ``uuid`` type on PostgreSQL, instead of
+36-character strings, which shrinks every primary key, foreign key and
+index that contains one. Application code and the API still see the
+canonical string form.
+
+Compact storage is opt-in through the ``COMPACT_KEYS`` app setting:
+databases created by older versions hold text keys, and the column type has
+to match what is on disk. ``configure_keys`` applies the setting to an
+engine and checks it against the stored keys on the first connection, so a
+process started with the wrong setting fails instead of matching no rows.
+
+Malformed IDs raise ``ValueError`` when bound, so callers check
+user-supplied IDs with ``parse_id`` first.
+"""
+import secrets
+import time
+import uuid
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import LargeBinary, String, TypeDecorator
+from werkzeug.routing import BaseConverter, ValidationError
+
+
+def new_id():
+    """Return a new time-ordered UUID string (UUIDv7 layout)."""
+    millis = time.time_ns() // 1_000_000
+    value = (millis & ((1 << 48) - 1)) << 80 | int.from_bytes(secrets.token_bytes(10), 'big')
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
+    return str(uuid.UUID(int=value))
+
+
+def _parse(value):
+    try:
+        return uuid.UUID(value)
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError(f'Invalid ID: {value!r}') from None
+
+
+def parse_id(value):
+    """Return ``value`` as a canonical UUID string; raises ``ValueError`` if it is not one."""
+    return str(_parse(value))
+
+
+def key_bytes(value):
+    """Return the 16-byte storage form of a key; raises ``ValueError`` if it is not one."""
+    return _parse(value).bytes
+
+
+class IDConverter(BaseConverter):
+    """URL converter for ``<id:...>`` segments; malformed IDs match no route and 404."""
+
+    def to_python(self, value):
+        try:
+            return parse_id(value)
+        except ValueError:
+            raise ValidationError()
+
+
+class KeyType(TypeDecorator):
+    """UUID key column that reads and writes canonical UUID strings."""
+
+    impl = String(36)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if not _compact(dialect):
+            return dialect.type_descriptor(String(36))
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=False))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None or not _compact(dialect):
+            return value
+        if dialect.name == 'postgresql':
+            return str(_parse(value))
+        return _parse(value).bytes
+
+    def process_result_value(self, value, dialect):
+        # Rows written before `flask compact-keys` ran may still hold text
+        if isinstance(value, bytes) and len(value) == 16:
+            return str(uuid.UUID(bytes=value))
+        return value
+
+
+def _compact(dialect):
+    return getattr(dialect, 'compact_keys', False)
+
+
+def stored_key_formats(connection, metadata):
+    """Return the formats (``'text'``, ``'compact'``) of the keys stored in ``metadata``'s tables.
+
+    Only the primary keys of the first and last rows of each table are
+    sampled: conversion works in row order and new rows are appended, so a
+    partly converted table or rows written with the other setting show up
+    at one end or the other.
+    """
+    inspector = inspect(connection)
+    existing = set(inspector.get_table_names())
+    formats = set()
+    for table in metadata.sorted_tables:
+        columns = [column for column in table.primary_key.columns if isinstance(column.type, KeyType)]
+        if table.name not in existing or not columns:
+            continue
+        column = columns[0]
+        if connection.dialect.name == 'postgresql':
+            stored = {c['name']: c['type'] for c in inspector.get_columns(table.name)}[column.name]
+            formats.add('compact' if isinstance(stored, postgresql.UUID) else 'text')
+            continue
+        for order in ('', ' DESC'):
+            kind = connection.execute(text(
+                f'SELECT typeof("{column.name}") FROM "{table.name}" ORDER BY rowid{order} LIMIT 1'
+            )).scalar()
+            if kind is not None:
+                formats.add('compact' if kind == 'blob' else 'text')
+    return formats
+
+
+def configure_keys(engine, metadata, compact):
+    """Store ``engine``'s keys compactly or as text, and refuse to run against keys stored the other way.
+
+    A partly converted database is accepted with text keys, so that an
+    interrupted ``flask compact-keys`` can be run again.
+    """
+    engine.dialect.compact_keys = compact
+    checked = []
+
+    @event.listens_for(engine, 'engine_connect')
+    def check_key_format(connection, branch):
+        if checked or branch:
+            return
+        formats = stored_key_formats(connection, metadata)
+        if compact and 'text' in formats:
+            raise RuntimeError(
+                'COMPACT_KEYS is set but the database holds text keys; '
+                'run "flask compact-keys" without it to convert them first'
+            )
+        if not compact and formats == {'compact'}:
+            raise RuntimeError('The database holds compact keys; set COMPACT_KEYS=1')
+        checked.append(True)
@@ -0,0 +1,255 @@
+"""Per-request latency, SQL and response-size instrumentation.
+
+``RequestMetrics(app)`` times every request, counts the SQL statements it
+issues through SQLAlchemy engine events and exposes per-route totals in
+Prometheus text format at ``/metrics``. Requests slower than
+``SLOW_REQUEST_THRESHOLD_MS`` are logged together with their SQL, and when
+``PROFILING_ENABLED`` is set a request sent with an ``X-Profile: 1`` header
+is run under a sampling profiler whose collapsed stacks are written to
+``PROFILE_DIR``.
+
+One ``RequestMetrics`` can serve several apps: each keeps its totals in
+``app.extensions['metrics']`` and the hooks read the settings of the app
+handling the request.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_LOGGED_STATEMENTS = 50
+
+
+class _RouteStats:
+    __slots__ = ('requests', 'statuses', 'duration_sum', 'buckets', 'sql_statements', 'sql_seconds',
+                 'response_bytes', 'phases')
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses = Counter()
+        self.duration_sum = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.response_bytes = 0
+        self.phases = defaultdict(float)
+
+
+@contextmanager
+def timed(phase):
+    """Attribute the time spent in the block to ``phase`` for the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if has_request_context() and hasattr(g, '_metrics_phases'):
+            g._metrics_phases[phase] += time.perf_counter() - started
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_metrics_started', []).append((context, time.perf_counter()))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _, started = conn.info['_metrics_started'].pop()
+    if not has_request_context() or not hasattr(g, '_metrics_sql'):
+        return
+    elapsed = time.perf_counter() - started
+    g._metrics_sql_count += 1
+    g._metrics_sql_seconds += elapsed
+    if len(g._metrics_sql) < MAX_LOGGED_STATEMENTS:
+        g._metrics_sql.append((elapsed, statement))
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    started = context.connection.info.get('_metrics_started') if context.connection is not None else None
+    if started and started[-1][0] is context.execution_context:
+        started.pop()
+
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval from a helper thread."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._run, daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Return the samples in the collapsed-stack format used by flame graph tools."""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common())
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _AppStats:
+    """Per-route totals for one app, kept in ``app.extensions['metrics']``."""
+
+    def __init__(self):
+        self.routes = defaultdict(_RouteStats)
+        self.lock = threading.Lock()
+
+
+class RequestMetrics:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_REQUEST_THRESHOLD_MS', 500)
+        app.config.setdefault('PROFILING_ENABLED', False)
+        app.config.setdefault('PROFILE_DIR', 'profiles')
+        app.config.setdefault('PROFILE_INTERVAL', 0.005)
+
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+
+        app.extensions['metrics'] = _AppStats()
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self._metrics_view)
+
+    def _before_request(self):
+        g._metrics_started = time.perf_counter()
+        g._metrics_sql = []
+        g._metrics_sql_count = 0
+        g._metrics_sql_seconds = 0.0
+        g._metrics_phases = defaultdict(float)
+        g._metrics_profiler = None
+        config = current_app.config
+        if config['PROFILING_ENABLED'] and request.headers.get('X-Profile') == '1':
+            g._metrics_profiler = SamplingProfiler(config['PROFILE_INTERVAL'])
+            g._metrics_profiler.start()
+
+    def _after_request(self, response):
+        if not hasattr(g, '_metrics_started'):
+            return response
+        elapsed = time.perf_counter() - g._metrics_started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        size = response.content_length or 0
+        app_stats = current_app.extensions['metrics']
+
+        with app_stats.lock:
+            stats = app_stats.routes[(route, request.method)]
+            stats.requests += 1
+            stats.statuses[response.status_code] += 1
+            stats.duration_sum += elapsed
+            for i, bound in enumerate(BUCKETS):
+                if elapsed <= bound:
+                    stats.buckets[i] += 1
+            stats.sql_statements += g._metrics_sql_count
+            stats.sql_seconds += g._metrics_sql_seconds
+            stats.response_bytes += size
+            for phase, seconds in g._metrics_phases.items():
+                stats.phases[phase] += seconds
+
+        if elapsed * 1000 >= current_app.config['SLOW_REQUEST_THRESHOLD_MS']:
+            statements = '\n'.join(
+                f'  [{seconds * 1000:.1f} ms] {statement}'
+                for seconds, statement in sorted(g._metrics_sql, reverse=True)
+            )
+            current_app.logger.warning(
+                'Slow request %s %s: %.1f ms, %d SQL statements (%.1f ms)\n%s',
+                request.method, request.path, elapsed * 1000,
+                g._metrics_sql_count, g._metrics_sql_seconds * 1000, statements
+            )
+
+        if g._metrics_profiler is not None:
+            g._metrics_profiler.stop()
+            os.makedirs(current_app.config['PROFILE_DIR'], exist_ok=True)
+            name = f'{time.strftime("%Y%m%d-%H%M%S")}-{request.method}-{route.strip("/").replace("/", "_") or "root"}.folded'
+            path = os.path.join(current_app.config['PROFILE_DIR'], name)
+            with open(path, 'w') as f:
+                f.write(g._metrics_profiler.collapsed())
+            response.headers['X-Profile-File'] = name
+            g._metrics_profiler = None
+        return response
+
+    def _teardown_request(self, exc):
+        # after_request is skipped when the view raises, so stop any profiler left running here
+        profiler = g.pop('_metrics_profiler', None)
+        if profiler is not None:
+            profiler.stop()
+
+    def render(self, app=None):
+        """Return ``app``'s route metrics (the current app's by default) in Prometheus text exposition format."""
+        app_stats = (app or current_app).extensions['metrics']
+        lines = [
+            '# HELP http_requests_total Requests handled, by route, method and status.',
+            '# TYPE http_requests_total counter',
+        ]
+        with app_stats.lock:
+            routes = sorted(app_stats.routes.items())
+            for (route, method), stats in routes:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'http_requests_total{{route="{_escape(route)}",method="{method}",status="{status}"}} {count}')
+
+            lines += [
+                '# HELP http_request_duration_seconds Wall time spent handling requests.',
+                '# TYPE http_request_duration_seconds histogram',
+            ]
+            for (route, method), stats in routes:
+                labels = f'route="{_escape(route)}",method="{method}"'
+                for bound, count in zip(BUCKETS, stats.buckets):
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.requests}')
+                lines.append(f'http_request_duration_seconds_sum{{{labels}}} {stats.duration_sum:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{{labels}}} {stats.requests}')
+
+            for name, help_text, attr in [
+                ('http_request_sql_statements_total', 'SQL statements issued while handling requests.', 'sql_statements'),
+                ('http_request_sql_seconds_total', 'Time spent executing SQL while handling requests.', 'sql_seconds'),
+                ('http_response_size_bytes_total', 'Response body bytes sent.', 'response_bytes'),
+            ]:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for (route, method), stats in routes:
+                    lines.append(f'{name}{{route="{_escape(route)}",method="{method}"}} {getattr(stats, attr)}')
+
+            lines += [
+                '# HELP http_request_phase_seconds_total Time spent in instrumented phases such as token decoding and password hashing.',
+                '# TYPE http_request_phase_seconds_total counter',
+            ]
+            for (route, method), stats in routes:
+                for phase, seconds in sorted(stats.phases.items()):
+                    lines.append(
+                        f'http_request_phase_seconds_total{{route="{_escape(route)}",method="{method}",phase="{phase}"}} {seconds:.6f}'
+                    )
+        return '\n'.join(lines) + '\n'
+
+    def _metrics_view(self):
+        return current_app.response_class(self.render(), mimetype='text/plain; version=0.0.4')
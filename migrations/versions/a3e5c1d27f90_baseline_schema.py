@@ -0,0 +1,82 @@
+"""Baseline schema
+
+The tables created by db.create_all() before migrations were introduced.
+init_db stamps databases of that age with this revision and upgrades them.
+
+Revision ID: a3e5c1d27f90
+Revises: 
+Create Date: 2026-10-17 01:05:12.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import keys
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e5c1d27f90'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('laboratory',
+    sa.Column('labID', keys.KeyType(length=36), nullable=False),
+    sa.Column('lab_name', sa.String(length=100), nullable=False),
+    sa.PrimaryKeyConstraint('labID'),
+    sa.UniqueConstraint('lab_name')
+    )
+    op.create_table('user',
+    sa.Column('userID', keys.KeyType(length=36), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('password', sa.String(length=200), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=False),
+    sa.PrimaryKeyConstraint('userID'),
+    sa.UniqueConstraint('email')
+    )
+    op.create_table('lab_equipment',
+    sa.Column('equipmentID', keys.KeyType(length=36), nullable=False),
+    sa.Column('labID', keys.KeyType(length=36), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('total_quantity', sa.Integer(), nullable=False),
+    sa.Column('available_quantity', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['labID'], ['laboratory.labID'], ),
+    sa.PrimaryKeyConstraint('equipmentID')
+    )
+    op.create_table('reservation',
+    sa.Column('reservationID', keys.KeyType(length=36), nullable=False),
+    sa.Column('userID', keys.KeyType(length=36), nullable=False),
+    sa.Column('equipmentID', keys.KeyType(length=36), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('end_time', sa.DateTime(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.String(length=500), nullable=True),
+    sa.Column('admin_notes', sa.String(length=200), nullable=True),
+    sa.Column('return_timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['equipmentID'], ['lab_equipment.equipmentID'], ),
+    sa.ForeignKeyConstraint(['userID'], ['user.userID'], ),
+    sa.PrimaryKeyConstraint('reservationID')
+    )
+    op.create_table('notification',
+    sa.Column('notificationID', keys.KeyType(length=36), nullable=False),
+    sa.Column('userID', keys.KeyType(length=36), nullable=False),
+    sa.Column('reservationID', keys.KeyType(length=36), nullable=False),
+    sa.Column('message', sa.String(length=200), nullable=False),
+    sa.Column('is_read', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['reservationID'], ['reservation.reservationID'], ),
+    sa.ForeignKeyConstraint(['userID'], ['user.userID'], ),
+    sa.PrimaryKeyConstraint('notificationID')
+    )
+
+
+def downgrade():
+    op.drop_table('notification')
+    op.drop_table('reservation')
+    op.drop_table('lab_equipment')
+    op.drop_table('user')
+    op.drop_table('laboratory')
@@ -0,0 +1,93 @@
+"""Keyset (cursor) pagination for list endpoints.
+
+Pages are ordered by a timestamp column with the primary key as a stable
+tiebreak. The cursor is an opaque token holding the ``(timestamp, id)`` of
+the last row on the previous page, so each page is a bounded index range
+scan no matter how deep into the history the client has paged.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+from keys import parse_id
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(sort_value, row_id):
+    payload = json.dumps([sort_value.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), parse_id(row_id)
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+
+
+def encode_offset(offset):
+    """Cursor for result sets ordered by a computed score, where keysets don't apply."""
+    return base64.urlsafe_b64encode(json.dumps(['offset', offset]).encode()).decode().rstrip('=')
+
+
+def decode_offset(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        tag, offset = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+    if tag != 'offset' or not isinstance(offset, int) or offset < 0:
+        raise PaginationError('Invalid cursor')
+    return offset
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be at least 1')
+    return min(limit, maximum)
+
+
+def after_cursor(sort_column, id_column, cursor, descending=False):
+    """Filter clause for rows that come after ``cursor`` in the given order."""
+    sort_value, row_id = decode_cursor(cursor)
+    if descending:
+        return or_(sort_column < sort_value, and_(sort_column == sort_value, id_column < row_id))
+    return or_(sort_column > sort_value, and_(sort_column == sort_value, id_column > row_id))
+
+
+def keyset_page(query, sort_column, id_column, limit, cursor=None, descending=False):
+    """Return ``(rows, next_cursor)`` for one page of ``query``.
+
+    ``next_cursor`` is ``None`` when there are no rows after this page.
+    """
+    if cursor is not None:
+        query = query.filter(after_cursor(sort_column, id_column, cursor, descending))
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
@@ -0,0 +1,148 @@
+"""Password hashing off the request thread, and admission control for logins.
+
+PBKDF2 is deliberately slow, so a burst of logins at the start of a lab
+session can tie up every worker thread. ``PasswordHasher`` runs the
+werkzeug hash functions in a small process pool and admits only a bounded
+number of pending jobs. Once that limit is reached callers get
+``HasherBusy`` straight away instead of queueing behind the burst.
+``LoginThrottle`` sheds repeated attempts per account and per client
+address before any hashing is done. The client address is whatever the
+WSGI server reports, so deployments behind a proxy must set
+``PROXY_FIX_X_FOR`` or every client shares the proxy's bucket.
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool is full or a hash did not finish in time."""
+
+
+def _normalize_method(method):
+    # werkzeug spells out the default iteration count in the stored hash
+    if method.startswith('pbkdf2:') and method.count(':') == 1:
+        return f'{method}:{DEFAULT_PBKDF2_ITERATIONS}'
+    return method
+
+
+class PasswordHasher:
+    """Hash and verify passwords in a bounded process pool.
+
+    ``workers=0`` hashes on the calling thread, which suits one-off scripts
+    and single-threaded tools. The pool is started on first use, so forking web servers
+    start one pool per worker process rather than sharing a broken one.
+    Workers are spawned, so scripts that use the pool need a
+    ``__main__`` guard.
+    """
+
+    def __init__(self, method='pbkdf2:sha256', salt_length=16, workers=2, max_pending=32, timeout=5.0):
+        self.method = _normalize_method(method)
+        self.salt_length = salt_length
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers do not inherit the web server's threads, locks or connections
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy('Too many password hashes in progress')
+        if not self.workers:
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException as e:
+            self._slots.release()
+            if isinstance(e, BrokenProcessPool):
+                self.shutdown()
+                raise HasherBusy('Password hashing pool restarted')
+            raise
+        # The slot is held until the job is finished or cancelled, not just
+        # until this caller stops waiting, so timed-out jobs still count
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Drops the job if it is still queued; a running one finishes
+            future.cancel()
+            raise HasherBusy('Password hash timed out')
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next request
+            self.shutdown()
+            raise HasherBusy('Password hashing pool restarted')
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, stored, password):
+        return self._run(check_password_hash, stored, password)
+
+    def needs_rehash(self, stored):
+        """True when ``stored`` was made with a different method or salt length."""
+        method, _, rest = stored.partition('$')
+        salt = rest.partition('$')[0]
+        return method != self.method or len(salt) != self.salt_length
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+class LoginThrottle:
+    """Token buckets that admit up to ``limit`` attempts per key and minute.
+
+    A full bucket allows a burst of ``limit`` attempts, after which attempts
+    are admitted at the refill rate. ``limit=0`` disables the throttle.
+    Buckets of keys that have not been seen for a while are dropped, so
+    memory stays bounded by ``maxsize``.
+    """
+
+    def __init__(self, limit, maxsize=10000):
+        self.limit = limit
+        self.maxsize = maxsize
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        """Take one attempt for ``key``; returns 0 if admitted, else seconds until the next one."""
+        if not self.limit:
+            return 0
+        rate = self.limit / 60.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.limit, now))
+            tokens = min(self.limit, tokens + (now - updated) * rate)
+            admitted = tokens >= 1
+            if admitted:
+                tokens -= 1
+            # Re-inserting keeps the dict in least-recently-seen order
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                del self._buckets[next(iter(self._buckets))]
+        return 0 if admitted else (1 - tokens) / rate
+
+    def refund(self, key):
+        """Give back an attempt taken by ``acquire`` that was never served."""
+        if not self.limit:
+            return
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated = self._buckets[key]
+                self._buckets[key] = (min(self.limit, tokens + 1), updated)
@@ -0,0 +1,64 @@
+"""Helpers for counting the SQL statements issued by a block of code.
+
+Used to guard list endpoints against N+1 query regressions::
+
+    with app.app_context():
+        assert_constant_queries(
+            lambda: client.get('/api/reservations'),
+            lambda: seed_reservations(50),
+        )
+"""
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """Context manager that records every statement sent to ``engine``."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return False
+
+
+def count_queries(engine, fn):
+    """Call ``fn`` and return ``(result, statement_count)``."""
+    with QueryCounter(engine) as counter:
+        result = fn()
+    return result, counter.count
+
+
+def assert_constant_queries(request_fn, grow_fn, engine=None):
+    """Fail if ``request_fn`` issues more statements after ``grow_fn`` adds rows.
+
+    ``request_fn`` is called once to warm up, then measured after each of two
+    calls to ``grow_fn``. Both measurements follow a write, so endpoints with
+    response caches are compared cold against cold. Any growth in the
+    statement count means the endpoint loads related objects per row.
+    """
+    if engine is None:
+        from app import db
+        engine = db.engine
+    request_fn()
+    grow_fn()
+    _, baseline = count_queries(engine, request_fn)
+    grow_fn()
+    _, grown = count_queries(engine, request_fn)
+    if grown > baseline:
+        raise AssertionError(
+            f'SQL statement count grew from {baseline} to {grown} as rows were added'
+        )
+    return baseline
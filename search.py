@@ -0,0 +1,143 @@
+"""Full-text prefix search over equipment, laboratories, reservations and users.
+
+On SQLite every searchable table gets an external-content FTS5 index. The
+index is kept in sync by triggers, so bulk inserts and set-based updates
+are covered too. On PostgreSQL the same columns get GIN indexes over
+``to_tsvector('simple', ...)`` expressions, which the database maintains
+itself. Either way the indexes are created with the tables (``create_all``)
+and can be (re)built for an existing database with ``flask rebuild-search``.
+
+SQLite FTS5 indexes follow the implicit ``rowid`` of their table, which
+``VACUUM`` may renumber. Run ``flask rebuild-search`` after vacuuming.
+"""
+import re
+from collections import namedtuple
+
+from sqlalchemy import bindparam, column, text
+
+from keys import KeyType
+
+Source = namedtuple('Source', ['table', 'key', 'columns', 'title', 'detail', 'join', 'owner'])
+
+SOURCES = {
+    'equipment': Source(
+        'lab_equipment', 'equipmentID', ('name',), 't.name', 'd.lab_name',
+        'LEFT JOIN laboratory d ON d."labID" = t."labID"', None
+    ),
+    'laboratory': Source('laboratory', 'labID', ('lab_name',), 't.lab_name', 'NULL', '', None),
+    'reservation': Source(
+        'reservation', 'reservationID', ('reason', 'admin_notes'), 't.reason', 'd.name',
+        'LEFT JOIN lab_equipment d ON d."equipmentID" = t."equipmentID"', 'userID'
+    ),
+    'user': Source('user', 'userID', ('name',), 't.name', 't.email', '', None),
+}
+
+MAX_TERMS = 8
+
+
+def search_terms(query):
+    """Split free text into at most ``MAX_TERMS`` lower-case word tokens."""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def match_expression(terms, dialect_name):
+    """Return a query matching rows that contain every term as a word prefix."""
+    if dialect_name == 'postgresql':
+        return ' & '.join(f'{term}:*' for term in terms)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _fts_table(kind):
+    return f'search_{kind}'
+
+
+def _tsvector(columns, alias=''):
+    parts = " || ' ' || ".join(f"coalesce({alias}\"{column}\", '')" for column in columns)
+    return f"to_tsvector('simple', {parts})"
+
+
+def _sqlite_ddl(kind, source):
+    fts = _fts_table(kind)
+    columns = ', '.join(f'"{column}"' for column in source.columns)
+    new_values = ', '.join(f'new."{column}"' for column in source.columns)
+    old_values = ', '.join(f'old."{column}"' for column in source.columns)
+    insert = f'INSERT INTO {fts}(rowid, {columns}) VALUES (new.rowid, {new_values});'
+    delete = f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});"
+    return [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content=\'{source.table}\', '
+        f'content_rowid=\'rowid\', tokenize=\'unicode61 remove_diacritics 2\', prefix=\'2 3\')',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON "{source.table}" BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON "{source.table}" BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON "{source.table}" '
+        f'BEGIN {delete} {insert} END',
+    ]
+
+
+def create_search_index(target, connection, **kw):
+    """Create the search indexes; safe to run against an existing database."""
+    for kind, source in SOURCES.items():
+        if connection.dialect.name == 'sqlite':
+            for statement in _sqlite_ddl(kind, source):
+                connection.execute(text(statement))
+        elif connection.dialect.name == 'postgresql':
+            connection.execute(text(
+                f'CREATE INDEX IF NOT EXISTS ix_{_fts_table(kind)} ON "{source.table}" '
+                f'USING gin (({_tsvector(source.columns)}))'
+            ))
+
+
+def drop_search_index(target, connection, **kw):
+    """Drop the SQLite FTS tables (their triggers go with the base tables)."""
+    if connection.dialect.name == 'sqlite':
+        for kind in SOURCES:
+            connection.execute(text(f'DROP TABLE IF EXISTS {_fts_table(kind)}'))
+
+
+def rebuild_search_index(connection):
+    """Create any missing search indexes and repopulate the SQLite ones from their tables."""
+    create_search_index(None, connection)
+    if connection.dialect.name == 'sqlite':
+        for kind in SOURCES:
+            fts = _fts_table(kind)
+            connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Alembic autogenerate filter that leaves the search tables and indexes alone."""
+    return not (reflected and compare_to is None and name and name.startswith(('search_', 'ix_search_')))
+
+
+def _branch(kind, source, dialect_name, owner):
+    if dialect_name == 'postgresql':
+        vector = _tsvector(source.columns, alias='t.')
+        rank = f"-ts_rank({vector}, to_tsquery('simple', :match))"
+        source_sql = f'"{source.table}" t'
+        condition = f"{vector} @@ to_tsquery('simple', :match)"
+    else:
+        fts = _fts_table(kind)
+        rank = f'bm25({fts})'
+        source_sql = f'{fts} JOIN "{source.table}" t ON t.rowid = {fts}.rowid'
+        condition = f'{fts} MATCH :match'
+    if owner and source.owner:
+        condition += f' AND t."{source.owner}" = :owner'
+    return (
+        f"SELECT '{kind}' AS type, t.\"{source.key}\" AS id, {source.title} AS title, "
+        f'{source.detail} AS detail, {rank} AS rank FROM {source_sql} {source.join} WHERE {condition}'
+    )
+
+
+def search_statement(kinds, dialect_name, owner=False):
+    """Best-ranked ``(type, id, title, detail)`` rows for ``kinds``, paged by ``:limit``/``:offset``.
+
+    With ``owner`` set, kinds that belong to a user only return rows whose
+    owner is ``:owner``.
+    """
+    owner = owner and any(SOURCES[kind].owner for kind in kinds)
+    branches = ' UNION ALL '.join(_branch(kind, SOURCES[kind], dialect_name, owner) for kind in kinds)
+    statement = text(
+        f'SELECT type, id, title, detail FROM ({branches}) AS results '
+        f'ORDER BY rank, type, id LIMIT :limit OFFSET :offset'
+    )
+    if owner:
+        statement = statement.bindparams(bindparam('owner', type_=KeyType))
+    return statement.columns(column('type'), column('id', KeyType), column('title'), column('detail'))
@@ -0,0 +1,72 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as lab_app  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = lab_app.create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'TESTING': True,
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'PASSWORD_HASH_WORKERS': 0,
+    })
+    with app.app_context():
+        lab_app.db.create_all()
+        yield app
+        lab_app.db.session.remove()
+        lab_app.db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def create_user(client, email, role='student', password='secret'):
+    response = client.post('/api/users', json={'name': email.split('@')[0], 'email': email, 'password': password, 'role': role})
+    assert response.status_code == 201, response.get_json()
+    token = client.post('/api/login', json={'email': email, 'password': password}).get_json()['token']
+    return response.get_json()['userID'], {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def admin(client):
+    return create_user(client, 'admin@example.com', 'admin')
+
+
+@pytest.fixture
+def student(client):
+    return create_user(client, 'student@example.com')
+
+
+@pytest.fixture
+def lab(client, admin):
+    response = client.post('/api/laboratories', json={'lab_name': 'Chemistry Lab'}, headers=admin[1])
+    return response.get_json()['laboratory']['labID']
+
+
+@pytest.fixture
+def equipment(client, admin, lab):
+    response = client.post('/api/equipment', json={'name': 'Microscope', 'labID': lab, 'total_quantity': 3}, headers=admin[1])
+    return response.get_json()['equipment']['equipmentID']
+
+
+@pytest.fixture
+def reserve(client, student, equipment):
+    """Post a reservation for the student; returns the response."""
+    def reserve(start, end, quantity=1, equipment_id=None, user_id=None):
+        return client.post('/api/reservations', json={
+            'userID': user_id or student[0],
+            'equipmentID': equipment_id or equipment,
+            'start_time': start,
+            'end_time': end,
+            'reason': 'Lab work',
+            'quantity': quantity,
+        })
+    return reserve
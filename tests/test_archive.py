@@ -0,0 +1,45 @@
+"""Archiving moves closed reservations out of the hot tables without losing notifications."""
+from datetime import datetime
+
+from app import (
+    NotificationEvent, Reservation, ReservationArchive, archive_closed_reservations, drain_notification_outbox
+)
+
+CUTOFF = datetime(2026, 3, 10)
+
+
+class FailingBackend:
+    name = 'failing'
+
+    def deliver(self, notifications):
+        for notification in notifications:
+            yield notification, 'unreachable'
+
+
+def test_archive_waits_for_undelivered_events(app, client, admin, reserve):
+    reservation_id = reserve('2026-03-01T10:00:00', '2026-03-01T12:00:00').get_json()['reservationID']
+    assert client.put(f'/api/reservations/{reservation_id}/status',
+                      json={'status': 'rejected'}, headers=admin[1]).status_code == 200
+
+    # The events have not been rendered or delivered yet
+    assert archive_closed_reservations(CUTOFF) == 0
+    drain_notification_outbox(backends=[FailingBackend()])
+    assert archive_closed_reservations(CUTOFF) == 0
+    assert Reservation.query.get(reservation_id) is not None
+
+    # Once delivery gives up, the dead events go with the reservation
+    for _ in range(app.config['NOTIFICATION_MAX_ATTEMPTS']):
+        NotificationEvent.query.update({'attempted_at': None})
+        drain_notification_outbox(backends=[FailingBackend()])
+    assert archive_closed_reservations(CUTOFF) == 1
+    assert Reservation.query.get(reservation_id) is None
+    assert ReservationArchive.query.get(reservation_id).status == 'rejected'
+    assert NotificationEvent.query.count() == 0
+
+
+def test_archive_moves_delivered_reservations(client, admin, reserve):
+    reservation_id = reserve('2026-03-01T10:00:00', '2026-03-01T12:00:00').get_json()['reservationID']
+    client.put(f'/api/reservations/{reservation_id}/status', json={'status': 'rejected'}, headers=admin[1])
+    drain_notification_outbox()
+    assert archive_closed_reservations(CUTOFF) == 1
+    assert ReservationArchive.query.get(reservation_id) is not None
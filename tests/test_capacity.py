@@ -0,0 +1,66 @@
+"""Bookings never hold more units than an item has at any moment."""
+from app import LabEquipment, Reservation, db
+
+
+def test_overlapping_bookings_share_capacity(reserve):
+    assert reserve('2026-03-01T10:00:00', '2026-03-01T12:00:00', 2).status_code == 201
+    assert reserve('2026-03-01T11:00:00', '2026-03-01T13:00:00', 1).status_code == 201
+    response = reserve('2026-03-01T11:30:00', '2026-03-01T11:45:00', 1)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'No available units during the requested time slot'
+
+
+def test_back_to_back_bookings_do_not_overlap(reserve):
+    assert reserve('2026-03-01T10:00:00', '2026-03-01T12:00:00', 3).status_code == 201
+    assert reserve('2026-03-01T12:00:00', '2026-03-01T14:00:00', 3).status_code == 201
+
+
+def test_released_units_can_be_booked_again(client, admin, reserve):
+    reservation_id = reserve('2026-03-01T10:00:00', '2026-03-01T12:00:00', 3).get_json()['reservationID']
+    assert reserve('2026-03-01T10:00:00', '2026-03-01T12:00:00', 1).status_code == 400
+    response = client.put(f'/api/reservations/{reservation_id}/status', json={'status': 'rejected'}, headers=admin[1])
+    assert response.status_code == 200
+    assert reserve('2026-03-01T10:00:00', '2026-03-01T12:00:00', 1).status_code == 201
+
+
+def test_batch_items_see_earlier_items(client, student, equipment):
+    item = {'equipmentID': equipment, 'start_time': '2026-03-02T10:00:00', 'end_time': '2026-03-02T11:00:00',
+            'reason': 'Lab work', 'quantity': 2}
+    response = client.post('/api/reservations/batch', json={'userID': student[0], 'reservations': [item, item]})
+    assert response.status_code == 201
+    results = response.get_json()['results']
+    assert 'reservationID' in results[0]
+    assert results[1]['error'] == 'No available units during the requested time slot'
+
+
+def test_approve_batch_rejects_overflow_in_request_order(client, admin, reserve, equipment):
+    first = reserve('2026-03-03T10:00:00', '2026-03-03T11:00:00', 2).get_json()['reservationID']
+    second = reserve('2026-03-03T10:30:00', '2026-03-03T11:30:00', 1).get_json()['reservationID']
+    # Take units away behind the bookings' back, so only the first request fits
+    LabEquipment.query.get(equipment).total_quantity = 2
+    db.session.commit()
+    response = client.post('/api/reservations/approve-batch',
+                           json={'equipmentID': equipment, 'overflow': 'reject'}, headers=admin[1])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['approved'] == [first]
+    assert body['rejected'] == [second]
+    assert Reservation.query.get(second).status == 'rejected'
+
+
+def test_approve_batch_normalizes_priority_ids(client, admin, reserve, equipment):
+    first = reserve('2026-03-04T10:00:00', '2026-03-04T11:00:00', 2).get_json()['reservationID']
+    second = reserve('2026-03-04T10:30:00', '2026-03-04T11:30:00', 1).get_json()['reservationID']
+    LabEquipment.query.get(equipment).total_quantity = 2
+    db.session.commit()
+    response = client.post('/api/reservations/approve-batch', json={
+        'equipmentID': equipment,
+        'order': 'priority',
+        'overflow': 'reject',
+        'priorities': {second.upper(): 10, 'not-an-id': 5},
+    }, headers=admin[1])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['approved'] == [second]
+    assert body['rejected'] == [first]
+    assert [item['reservationID'] for item in body['skipped']] == ['not-an-id']
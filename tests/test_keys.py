@@ -0,0 +1,67 @@
+"""Keys are canonical UUID strings, malformed ones never reach a query, and storage matches the setting."""
+import pytest
+
+import app as lab_app
+
+
+def test_malformed_ids_are_rejected(client, student, reserve):
+    response = reserve('2026-03-01T10:00:00', '2026-03-01T12:00:00', 1, equipment_id='not-an-id')
+    assert response.status_code == 400
+    assert client.get('/api/users/not-an-id').status_code == 404
+
+
+def make_app(path, compact):
+    return lab_app.create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'COMPACT_KEYS': compact,
+        'PASSWORD_HASH_WORKERS': 0,
+    })
+
+
+@pytest.fixture
+def text_db(tmp_path):
+    """A file database with text keys and one user; returns (path, user ID)."""
+    path = tmp_path / 'keys.db'
+    app = make_app(path, False)
+    with app.app_context():
+        lab_app.db.create_all()
+        user = lab_app.User(name='a', email='a@example.com', password='x', role='student')
+        lab_app.db.session.add(user)
+        lab_app.db.session.commit()
+        user_id = user.userID
+        lab_app.db.session.remove()
+        lab_app.db.engine.dispose()
+    return path, user_id
+
+
+def test_compact_keys_setting_must_match_the_database(text_db):
+    path, user_id = text_db
+    app = make_app(path, True)
+    with app.app_context():
+        with pytest.raises(RuntimeError, match='holds text keys'):
+            lab_app.User.query.get(user_id)
+        lab_app.db.session.remove()
+        lab_app.db.engine.dispose()
+
+
+def test_converted_database_needs_the_setting(text_db):
+    path, user_id = text_db
+    app = make_app(path, False)
+    result = app.test_cli_runner().invoke(args=['compact-keys'])
+    assert result.exit_code == 0, result.output
+    assert 'Converted 1 keys in user.userID' in result.output
+    with app.app_context():
+        lab_app.db.engine.dispose()
+
+    app = make_app(path, False)
+    with app.app_context():
+        with pytest.raises(RuntimeError, match='holds compact keys'):
+            lab_app.User.query.get(user_id)
+        lab_app.db.session.remove()
+        lab_app.db.engine.dispose()
+
+    app = make_app(path, True)
+    with app.app_context():
+        assert lab_app.User.query.get(user_id).email == 'a@example.com'
+        lab_app.db.session.remove()
+        lab_app.db.engine.dispose()
@@ -0,0 +1,30 @@
+"""Request metrics are kept and configured per app."""
+import logging
+
+import app as lab_app
+
+
+def make_app(**config):
+    return lab_app.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'PASSWORD_HASH_WORKERS': 0, **config})
+
+
+def test_apps_keep_separate_metrics(caplog):
+    quiet = make_app()
+    slow = make_app(SLOW_REQUEST_THRESHOLD_MS=0)
+    for app in (quiet, slow):
+        with app.app_context():
+            lab_app.db.create_all()
+
+    with caplog.at_level(logging.WARNING):
+        assert quiet.test_client().get('/api/laboratories').status_code == 200
+    assert 'Slow request' not in caplog.text
+    with caplog.at_level(logging.WARNING):
+        assert slow.test_client().get('/api/equipment').status_code == 200
+    assert 'Slow request GET /api/equipment' in caplog.text
+
+    quiet_report = quiet.test_client().get('/metrics').get_data(as_text=True)
+    slow_report = slow.test_client().get('/metrics').get_data(as_text=True)
+    assert 'route="/api/laboratories"' in quiet_report
+    assert 'route="/api/equipment"' not in quiet_report
+    assert 'route="/api/equipment"' in slow_report
+    assert 'route="/api/laboratories"' not in slow_report
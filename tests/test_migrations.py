@@ -0,0 +1,67 @@
+"""init_db adopts databases created before migrations and brings them to the head revision."""
+from flask_migrate import upgrade
+import pytest
+from sqlalchemy import inspect
+
+import app as lab_app
+import search
+from keys import new_id
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    app = lab_app.create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "legacy.db"}',
+        'PASSWORD_HASH_WORKERS': 0,
+    })
+    with app.app_context():
+        yield app
+        lab_app.db.session.remove()
+        lab_app.db.engine.dispose()
+
+
+def make_legacy_database():
+    """Build the baseline schema with a few rows and no migration history, like db.create_all() used to."""
+    upgrade(revision=lab_app.BASELINE_REVISION)
+    lab_id, equipment_id = new_id(), new_id()
+    with lab_app.db.engine.begin() as connection:
+        connection.exec_driver_sql('DROP TABLE alembic_version')
+        connection.exec_driver_sql('INSERT INTO laboratory ("labID", lab_name) VALUES (?, ?)', (lab_id, 'Optics Lab'))
+        connection.exec_driver_sql(
+            'INSERT INTO lab_equipment ("equipmentID", "labID", name, status, total_quantity, available_quantity) '
+            'VALUES (?, ?, ?, ?, ?, ?)', (equipment_id, lab_id, 'Interferometer', 'available', 2, 2)
+        )
+    return equipment_id
+
+
+def search_ids(kind, query):
+    dialect_name = lab_app.db.engine.dialect.name
+    rows = lab_app.db.session.execute(search.search_statement([kind], dialect_name), {
+        'match': search.match_expression(search.search_terms(query), dialect_name),
+        'limit': 10,
+        'offset': 0,
+    })
+    return [row.id for row in rows]
+
+
+def test_init_db_adopts_a_legacy_database(file_app):
+    equipment_id = make_legacy_database()
+    lab_app.init_db()
+
+    tables = inspect(lab_app.db.engine).get_table_names()
+    assert {'alembic_version', 'notification_outbox', 'utilization_daily'} <= set(tables)
+    assert lab_app.LabEquipment.query.get(equipment_id).name == 'Interferometer'
+    # Rows that existed before the search indexes are found without a manual rebuild
+    assert search_ids('equipment', 'interfer') == [equipment_id]
+    assert len(search_ids('laboratory', 'optics')) == 1
+    # The default laboratories were seeded next to the existing one
+    assert lab_app.Laboratory.query.count() == len(lab_app.DEFAULT_LABORATORIES) + 1
+
+
+def test_init_db_refuses_an_unknown_schema(file_app):
+    make_legacy_database()
+    with lab_app.db.engine.begin() as connection:
+        connection.exec_driver_sql('ALTER TABLE lab_equipment ADD COLUMN serial VARCHAR(50)')
+    with pytest.raises(RuntimeError, match='does not match the baseline schema'):
+        lab_app.init_db()
+    assert 'alembic_version' not in inspect(lab_app.db.engine).get_table_names()
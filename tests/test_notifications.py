@@ -0,0 +1,94 @@
+"""Notifications go through the outbox, and clients poll them with a since cursor."""
+from app import Notification, NotificationEvent, drain_notification_outbox
+from conftest import create_user
+
+
+class RecordingBackend:
+    """Accepts messages and records their IDs; refuses the first ``fail`` messages it sees."""
+
+    def __init__(self, name, fail=0):
+        self.name = name
+        self.fail = fail
+        self.received = []
+
+    def deliver(self, notifications):
+        for notification in notifications:
+            self.received.append(notification['notificationID'])
+            if self.fail:
+                self.fail -= 1
+                yield notification, 'refused'
+            else:
+                yield notification, None
+
+
+def test_outbox_renders_events_into_notifications(reserve):
+    reserve('2026-03-01T10:00:00', '2026-03-01T11:00:00')
+    reserve('2026-03-02T10:00:00', '2026-03-02T11:00:00')
+    assert drain_notification_outbox() == (2, 2)
+    assert Notification.query.count() == 2
+    assert drain_notification_outbox() == (0, 0)
+
+
+def test_outbox_retries_only_failed_messages_on_failed_backends(app, reserve):
+    app.config['NOTIFICATION_RETRY_DELAY'] = 0
+    reserve('2026-03-01T10:00:00', '2026-03-01T11:00:00')
+    reserve('2026-03-02T10:00:00', '2026-03-02T11:00:00')
+    log = RecordingBackend('file')
+    smtp = RecordingBackend('smtp', fail=1)
+
+    assert drain_notification_outbox(backends=[log, smtp]) == (2, 1)
+    failed_id = smtp.received[0]
+    failed = NotificationEvent.query.filter_by(notificationID=failed_id).one()
+    assert (failed.attempts, failed.delivered_to, failed.delivered_at) == (1, 'file', None)
+    assert failed.last_error == 'smtp: refused'
+
+    # The retry goes to the backend that refused it, and only for that message
+    assert drain_notification_outbox(backends=[log, smtp]) == (0, 1)
+    assert len(log.received) == 2
+    assert smtp.received[2:] == [failed_id]
+    assert drain_notification_outbox(backends=[log, smtp]) == (0, 0)
+
+
+def test_outbox_gives_up_after_max_attempts(app, reserve):
+    app.config.update(NOTIFICATION_RETRY_DELAY=0, NOTIFICATION_MAX_ATTEMPTS=2)
+    reserve('2026-03-01T10:00:00', '2026-03-01T11:00:00')
+    smtp = RecordingBackend('smtp', fail=10)
+    for _ in range(4):
+        drain_notification_outbox(backends=[smtp])
+    assert len(smtp.received) == 2
+    assert NotificationEvent.query.one().attempts == 2
+
+
+def test_since_cursor_returns_only_newer_notifications(client, student, reserve):
+    url = f'/api/notifications/{student[0]}'
+    reserve('2026-03-01T10:00:00', '2026-03-01T11:00:00')
+    drain_notification_outbox()
+    first = client.get(url)
+    assert len(first.get_json()) == 1
+    cursor = first.headers['X-Latest-Cursor']
+
+    # Nothing new: an empty page that keeps the same cursor, and the ETag still matches
+    unchanged = client.get(url, query_string={'since': cursor})
+    assert unchanged.get_json() == []
+    assert unchanged.headers['X-Latest-Cursor'] == cursor
+    assert client.get(url, headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    reserve('2026-03-02T10:00:00', '2026-03-02T11:00:00')
+    reserve('2026-03-03T10:00:00', '2026-03-03T11:00:00')
+    drain_notification_outbox()
+    newer = client.get(url, query_string={'since': cursor})
+    assert len(newer.get_json()) == 2
+    assert first.get_json()[0]['notificationID'] not in {n['notificationID'] for n in newer.get_json()}
+    assert client.get(url, query_string={'since': newer.headers['X-Latest-Cursor']}).get_json() == []
+    assert client.get(url, query_string={'since': 'garbage'}).status_code == 400
+
+
+def test_only_the_owner_or_an_admin_marks_notifications_read(client, admin, student, reserve):
+    reserve('2026-03-01T10:00:00', '2026-03-01T11:00:00')
+    drain_notification_outbox()
+    _, other = create_user(client, 'other@example.com')
+    url = f'/api/notifications/{student[0]}/read'
+    assert client.put(url, headers=other).status_code == 403
+    assert client.put(url).status_code == 401
+    assert client.put(url, headers=student[1]).status_code == 200
+    assert Notification.query.filter_by(is_read=False).count() == 0
@@ -0,0 +1,64 @@
+"""List endpoints must not issue more SQL as the number of rows grows."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import (
+    LabEquipment, Reservation, User, bump_catalog_version, db, drain_notification_outbox, enqueue_notification
+)
+from querycount import assert_constant_queries
+
+
+@pytest.fixture
+def grow(lab):
+    """Add reservations for new users and new equipment, so per-row lookups would show."""
+    counter = iter(range(1000))
+
+    def grow(count=5):
+        for _ in range(count):
+            n = next(counter)
+            user = User(name=f'user{n}', email=f'user{n}@example.com', password='x', role='student')
+            item = LabEquipment(name=f'item{n}', labID=lab, total_quantity=2, available_quantity=2)
+            db.session.add_all([user, item])
+            db.session.flush()
+            start = datetime(2026, 1, 1) + timedelta(hours=n)
+            reservation = Reservation(userID=user.userID, equipmentID=item.equipmentID, start_time=start,
+                                      end_time=start + timedelta(hours=1), status='pending', quantity=1, reason='r')
+            db.session.add(reservation)
+            db.session.flush()
+            enqueue_notification('reservation_created', user.userID, reservation.reservationID,
+                                 quantity=1, equipment_name=item.name)
+        bump_catalog_version()
+        db.session.commit()
+        drain_notification_outbox()
+    return grow
+
+
+@pytest.mark.parametrize('path', ['/api/reservations', '/api/equipment', '/api/laboratories'])
+def test_public_lists(client, grow, path):
+    assert_constant_queries(lambda: client.get(path), grow)
+    assert client.get(path).get_json()
+
+
+def test_user_list(client, admin, grow):
+    assert_constant_queries(lambda: client.get('/api/users', headers=admin[1]), grow)
+
+
+def test_user_reservations(client, student, equipment, grow):
+    def grow_for_student():
+        grow()
+        for reservation in Reservation.query.filter(Reservation.userID != student[0]).all():
+            reservation.userID = student[0]
+        db.session.commit()
+    assert_constant_queries(lambda: client.get(f'/api/users/{student[0]}/reservations'), grow_for_student)
+
+
+def test_notifications(client, student, reserve):
+    day = iter(range(1, 28))
+
+    def grow_notifications():
+        for _ in range(3):
+            d = next(day)
+            assert reserve(f'2026-02-{d:02d}T10:00:00', f'2026-02-{d:02d}T11:00:00').status_code == 201
+        drain_notification_outbox()
+    assert_constant_queries(lambda: client.get(f'/api/notifications/{student[0]}'), grow_notifications)
@@ -0,0 +1,70 @@
+"""The overdue sweeper closes expired bookings and gives their units back."""
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import Query
+
+from app import LabEquipment, NotificationEvent, Reservation, sweep_overdue_reservations
+
+CUTOFF = datetime(2026, 3, 10)
+
+
+@pytest.fixture
+def approve(client, admin):
+    def approve(response):
+        reservation_id = response.get_json()['reservationID']
+        assert client.put(f'/api/reservations/{reservation_id}/status',
+                          json={'status': 'approved'}, headers=admin[1]).status_code == 200
+        return reservation_id
+    return approve
+
+
+def available(equipment_id):
+    return LabEquipment.query.get(equipment_id).available_quantity
+
+
+@pytest.mark.parametrize('policy, status', [('overdue', 'overdue'), ('complete', 'completed')])
+def test_sweep_closes_expired_bookings(reserve, approve, equipment, policy, status):
+    expired = approve(reserve('2026-03-01T10:00:00', '2026-03-01T12:00:00', 2))
+    current = approve(reserve('2026-03-20T10:00:00', '2026-03-20T12:00:00', 1))
+    assert available(equipment) == 0
+    event_type = 'reservation_overdue' if policy == 'overdue' else 'reservation_status'
+    events = NotificationEvent.query.filter_by(reservationID=expired, event_type=event_type)
+    before = events.count()
+
+    assert sweep_overdue_reservations(CUTOFF, policy) == 1
+    assert Reservation.query.get(expired).status == status
+    assert Reservation.query.get(current).status == 'approved'
+    assert available(equipment) == 2
+    assert events.count() == before + 1
+
+    # Nothing is left to sweep, and a second run releases nothing twice
+    assert sweep_overdue_reservations(CUTOFF, policy) == 0
+    assert available(equipment) == 2
+
+
+def test_sweep_works_in_batches(reserve, approve, equipment):
+    for day in (1, 2, 3):
+        approve(reserve(f'2026-03-0{day}T10:00:00', f'2026-03-0{day}T11:00:00'))
+    assert sweep_overdue_reservations(CUTOFF, batch_size=2) == 2
+    assert sweep_overdue_reservations(CUTOFF, batch_size=2) == 1
+    assert sweep_overdue_reservations(CUTOFF, batch_size=2) == 0
+    assert available(equipment) == 3
+
+
+def test_sweep_command(app, reserve, approve):
+    expired = approve(reserve('2020-03-01T10:00:00', '2020-03-01T12:00:00'))
+    result = app.test_cli_runner().invoke(args=['sweep-overdue'])
+    assert result.exit_code == 0, result.output
+    assert 'Swept 1 overdue reservations' in result.output
+    assert Reservation.query.get(expired).status == 'overdue'
+
+
+def test_sweep_gives_up_on_a_batch_that_keeps_changing(reserve, approve, monkeypatch, caplog):
+    expired = approve(reserve('2026-03-01T10:00:00', '2026-03-01T12:00:00'))
+    # Every read finds the batch already changed by someone else
+    monkeypatch.setattr(Query, 'update', lambda *args, **kwargs: 0)
+    assert sweep_overdue_reservations(CUTOFF) == 0
+    assert 'gave up after' in caplog.text
+    monkeypatch.undo()
+    assert Reservation.query.get(expired).status == 'approved'
@@ -0,0 +1,78 @@
+"""Login admission control: per-account and per-address token buckets."""
+import pytest
+
+from passwords import HasherBusy, LoginThrottle
+
+
+def test_bucket_allows_a_burst_then_refuses():
+    throttle = LoginThrottle(limit=3)
+    assert [throttle.acquire('key') for _ in range(3)] == [0, 0, 0]
+    retry_after = throttle.acquire('key')
+    assert 0 < retry_after <= 60 / 3
+    assert throttle.acquire('other') == 0
+
+
+def test_refund_returns_an_attempt():
+    throttle = LoginThrottle(limit=1)
+    assert throttle.acquire('key') == 0
+    throttle.refund('key')
+    assert throttle.acquire('key') == 0
+    assert throttle.acquire('key') > 0
+
+
+def test_zero_limit_disables_the_throttle():
+    throttle = LoginThrottle(limit=0)
+    assert all(throttle.acquire('key') == 0 for _ in range(100))
+
+
+def test_buckets_are_bounded():
+    throttle = LoginThrottle(limit=1, maxsize=2)
+    for key in ('a', 'b', 'c'):
+        throttle.acquire(key)
+    # The least recently seen key was dropped and starts with a full bucket
+    assert throttle.acquire('a') == 0
+    assert throttle.acquire('c') > 0
+
+
+@pytest.fixture
+def login(client):
+    client.post('/api/users', json={'name': 's', 'email': 's@example.com', 'password': 'secret', 'role': 'student'})
+
+    def login(password='secret', email='s@example.com'):
+        return client.post('/api/login', json={'email': email, 'password': password})
+    return login
+
+
+def test_login_is_throttled_per_account(app, login):
+    app.extensions['login_account_throttle'] = LoginThrottle(limit=2)
+    assert login('wrong').status_code == 401
+    assert login('wrong').status_code == 401
+    response = login('secret')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    # Other accounts are unaffected
+    assert login(email='nobody@example.com').status_code == 401
+
+
+def test_login_is_throttled_per_address(app, login):
+    app.extensions['login_ip_throttle'] = LoginThrottle(limit=1)
+    assert login().status_code == 200
+    assert login(email='nobody@example.com').status_code == 429
+
+
+def test_busy_hasher_does_not_use_up_attempts(app, login, monkeypatch):
+    app.extensions['login_account_throttle'] = LoginThrottle(limit=1)
+    hasher = app.extensions['password_hasher']
+
+    def busy(*args):
+        raise HasherBusy('Too many password hashes in progress')
+    monkeypatch.setattr(hasher, 'verify', busy)
+    assert login().status_code == 503
+    monkeypatch.undo()
+    assert login().status_code == 200
+
+
+@pytest.mark.parametrize('body', [{'email': ['s@example.com'], 'password': 'secret'},
+                                  {'email': 's@example.com', 'password': 1234}])
+def test_login_rejects_non_string_credentials(client, login, body):
+    assert client.post('/api/login', json=body).status_code == 400
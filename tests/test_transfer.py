@@ -0,0 +1,77 @@
+"""Bulk equipment import and reservation export in CSV and NDJSON."""
+import csv
+import io
+import json
+
+from app import LabEquipment, Reservation, db
+
+
+def post_import(client, admin, body, fmt):
+    return client.post(f'/api/equipment/import?format={fmt}', data=body.encode(), headers=admin[1])
+
+
+def test_csv_import_reports_bad_rows_and_keeps_good_ones(client, admin, lab):
+    body = (
+        'name,labID,total_quantity,status\n'
+        f'Oscilloscope,{lab.upper()},4,available\n'
+        f'Centrifuge,{lab},0,available\n'
+        f'Spectrometer,{lab},2.7,available\n'
+        f'Balance,{lab},1,broken\n'
+        'Hot plate,not-an-id,1,available\n'
+    )
+    response = post_import(client, admin, body, 'csv')
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['imported'] == 1
+    assert [error['line'] for error in body['errors']] == [3, 4, 5, 6]
+    item = LabEquipment.query.filter_by(name='Oscilloscope').one()
+    assert item.labID == lab
+    assert (item.total_quantity, item.available_quantity) == (4, 4)
+
+
+def test_ndjson_import_checks_field_types(client, admin, lab):
+    records = [
+        {'name': 'Oscilloscope', 'labID': lab, 'total_quantity': 4},
+        {'name': {'x': 1}, 'labID': lab, 'total_quantity': 1},
+        {'name': '  ', 'labID': lab, 'total_quantity': 1},
+        {'name': 'Spectrometer', 'labID': lab, 'total_quantity': 2.7},
+        {'name': 'Balance', 'lab_name': ['Chemistry Lab'], 'total_quantity': 1},
+        {'name': 'Centrifuge', 'lab_name': 'Chemistry Lab', 'total_quantity': '2'},
+    ]
+    body = '\n'.join(json.dumps(record) for record in records) + '\nnot json\n'
+    response = post_import(client, admin, body, 'ndjson')
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['imported'] == 2
+    assert body['failed'] == 5
+    errors = {error['line']: error['error'] for error in body['errors']}
+    assert sorted(errors) == [2, 3, 4, 5, 7]
+    assert errors[2] == errors[3] == 'name must be a non-empty string'
+    assert errors[4] == 'Total quantity must be a whole number'
+    assert errors[5] == 'Laboratory not found'
+    assert LabEquipment.query.filter_by(name='Centrifuge').one().total_quantity == 2
+
+
+def test_export_streams_reservations(client, admin, reserve):
+    reserve('2026-03-01T10:00:00', '2026-03-01T12:00:00', 1)
+
+    response = client.get('/api/reservations/export?format=csv', headers=admin[1])
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 1
+    assert rows[0]['equipment_name'] == 'Microscope'
+    assert rows[0]['quantity'] == '1'
+
+    response = client.get('/api/reservations/export?format=ndjson', headers=admin[1])
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [record['reservationID'] for record in records] == [rows[0]['reservationID']]
+
+
+def test_csv_export_escapes_formulas(client, admin, reserve):
+    reserve('2026-03-01T10:00:00', '2026-03-01T12:00:00', 1)
+    Reservation.query.one().reason = '=cmd()'
+    db.session.commit()
+    text = client.get('/api/reservations/export?format=csv', headers=admin[1]).get_data(as_text=True)
+    assert "'=cmd()" in text
+    ndjson = client.get('/api/reservations/export?format=ndjson', headers=admin[1]).get_data(as_text=True)
+    assert json.loads(ndjson)['reason'] == '=cmd()'
@@ -0,0 +1,62 @@
+"""The incrementally maintained utilization rollup always matches a full rebuild."""
+from datetime import date, datetime
+
+from app import (
+    UtilizationDaily, archive_closed_reservations, db, drain_notification_outbox, rebuild_utilization,
+    sweep_overdue_reservations
+)
+from utilization import COUNTERS
+
+
+def rollup():
+    """The rollup as ``{(equipmentID, day): counters}``, leaving out rows that count nothing."""
+    rows = {}
+    for row in UtilizationDaily.query:
+        counters = tuple(round(getattr(row, counter), 6) for counter in COUNTERS)
+        if any(counters):
+            rows[(row.equipmentID, row.day)] = (row.labID, counters)
+    return rows
+
+
+def test_incremental_rollup_matches_a_rebuild(client, admin, reserve, equipment):
+    def set_status(reservation_id, status):
+        response = client.put(f'/api/reservations/{reservation_id}/status', json={'status': status}, headers=admin[1])
+        assert response.status_code == 200, response.get_json()
+
+    def book(start, end, quantity=1):
+        return reserve(start, end, quantity).get_json()['reservationID']
+
+    # Single and multi-day bookings through each kind of transition
+    approved = book('2026-03-01T22:00:00', '2026-03-03T02:00:00')
+    set_status(approved, 'approved')
+    returned = book('2026-03-04T10:00:00', '2026-03-04T12:00:00', 2)
+    set_status(returned, 'approved')
+    set_status(returned, 'returned')
+    set_status(book('2026-03-05T10:00:00', '2026-03-05T12:00:00'), 'rejected')
+    # Bulk approval and the overdue sweeper apply their own deltas
+    book('2026-03-06T09:00:00', '2026-03-06T11:00:00')
+    book('2026-03-07T09:00:00', '2026-03-07T11:00:00')
+    response = client.post('/api/reservations/approve-batch', json={'equipmentID': equipment}, headers=admin[1])
+    assert len(response.get_json()['approved']) == 2
+    assert sweep_overdue_reservations(datetime(2026, 3, 7), 'complete') == 2
+    # History that has been archived still counts
+    drain_notification_outbox()
+    assert archive_closed_reservations(datetime(2026, 3, 7)) == 4
+
+    incremental = rollup()
+    assert incremental
+    assert rebuild_utilization() == len(UtilizationDaily.query.all())
+    db.session.commit()
+    assert rollup() == incremental
+
+
+def test_partial_rebuild_keeps_other_days(client, admin, reserve):
+    for day in (1, 2, 3):
+        reservation_id = reserve(f'2026-03-0{day}T10:00:00', f'2026-03-0{day}T12:00:00').get_json()['reservationID']
+        client.put(f'/api/reservations/{reservation_id}/status', json={'status': 'approved'}, headers=admin[1])
+    before = rollup()
+    UtilizationDaily.query.filter(UtilizationDaily.day == date(2026, 3, 2)).delete()
+    db.session.commit()
+    rebuild_utilization(date(2026, 3, 2), date(2026, 3, 2))
+    db.session.commit()
+    assert rollup() == before
@@ -0,0 +1,64 @@
+"""Per-day utilization counters derived from a reservation's current state.
+
+A reservation's contribution to the daily rollup depends only on its status,
+times, quantity and return timestamp. Status changes therefore apply the
+difference between the new and old contributions. A full rebuild sums the
+contributions of every reservation, so both paths always agree.
+
+Counts are attributed to the (UTC) day the reservation starts. Booked
+unit-hours are split across every day the reservation covers.
+"""
+from datetime import datetime, time, timedelta
+
+COUNTERS = ('approved', 'rejected', 'returned', 'completed', 'late_returns', 'unit_hours')
+
+# Statuses whose units were handed out and therefore count as booked time
+BOOKED_STATUSES = ('approved', 'overdue', 'returned', 'completed')
+
+# Statuses that contribute anything at all; everything else is skipped on rebuild
+ROLLUP_STATUSES = BOOKED_STATUSES + ('rejected',)
+
+
+def day_hours(start, end):
+    """Yield ``(date, hours)`` for every calendar day that ``[start, end)`` covers."""
+    while start < end:
+        next_day = datetime.combine(start.date() + timedelta(days=1), time.min)
+        boundary = min(next_day, end)
+        yield start.date(), (boundary - start).total_seconds() / 3600
+        start = boundary
+
+
+def contribution(status, start, end, quantity, return_timestamp=None):
+    """Return ``{date: {counter: amount}}`` for one reservation in ``status``."""
+    counts = {}
+    if status in BOOKED_STATUSES:
+        counts['approved'] = 1
+    if status in ('rejected', 'returned', 'completed'):
+        counts[status] = 1
+    if status in ('returned', 'completed') and return_timestamp is not None and return_timestamp > end:
+        counts['late_returns'] = 1
+
+    result = {start.date(): counts} if counts else {}
+    if status in BOOKED_STATUSES:
+        for day, hours in day_hours(start, end):
+            result.setdefault(day, {})['unit_hours'] = hours * quantity
+    return result
+
+
+def accumulate(totals, contrib, sign=1):
+    """Add ``sign`` times ``contrib`` into ``totals`` in place; returns ``totals``."""
+    for day, counters in contrib.items():
+        day_totals = totals.setdefault(day, {})
+        for counter, amount in counters.items():
+            day_totals[counter] = day_totals.get(counter, 0) + sign * amount
+    return totals
+
+
+def difference(new, old):
+    """Return ``new - old``, leaving out counters that did not change."""
+    delta = accumulate(accumulate({}, new), old, sign=-1)
+    return {
+        day: {counter: amount for counter, amount in counters.items() if amount}
+        for day, counters in delta.items()
+        if any(counters.values())
+    }